@@ -0,0 +1,164 @@
+"""
+Page Analysis Module for XSSProbe
+Parses fetched pages into compact PageModel objects, optionally in worker processes
+
+BeautifulSoup parsing and the DOM regex analysis are pure-Python CPU work.
+Run on the same interpreter as the fetching threads they hold the GIL and
+starve network I/O, so the scanner hands raw HTML to an AnalysisPool of
+worker processes and gets back only what it needs: forms, links and
+JavaScript. With zero workers everything is parsed in-process.
+"""
+
+import multiprocessing
+import os
+from concurrent.futures import Future, ProcessPoolExecutor
+from bs4 import BeautifulSoup
+
+
+class PageModel:
+    """
+    The parts of a page the scanner uses
+
+    Attributes:
+        url (str): Page URL
+        forms (list): Dicts with 'method', 'action' (None if absent) and
+            'fields', a list of (name, type) tuples for named inputs/textareas
+        links (list): Raw href values of <a> tags
+        scripts (list): Inline <script> bodies
+        handlers (list): Inline event handler attribute values (onclick...)
+        dom (dict): DOM XSS analysis ('analysis', 'vulnerabilities', 'incomplete'), if requested
+    """
+
+    __slots__ = ('url', 'forms', 'links', 'scripts', 'handlers', 'dom')
+
+    def __init__(self, url, forms=(), links=(), scripts=(), handlers=(), dom=None):
+        self.url = url
+        self.forms = list(forms)
+        self.links = list(links)
+        self.scripts = list(scripts)
+        self.handlers = list(handlers)
+        self.dom = dom
+
+    @property
+    def javascript(self):
+        """All inline JavaScript, one block per line as extract_javascript() returns it"""
+        return "".join(code + "\n" for code in self.scripts + self.handlers)
+
+    def __repr__(self):
+        return "<PageModel %s forms=%d links=%d scripts=%d>" % (
+            self.url, len(self.forms), len(self.links), len(self.scripts))
+
+
+_detector = None
+
+
+def parse_page(url, html, dom=False):
+    """
+    Parse HTML into a PageModel (runs inside worker processes)
+
+    Args:
+        url (str): Page URL
+        html (str): Page content
+        dom (bool): Also run the DOM XSS source/sink and pattern analysis
+
+    Returns:
+        PageModel: Compact page model
+    """
+    global _detector
+
+    soup = BeautifulSoup(html, "html.parser")
+
+    forms = []
+    for form in soup.find_all("form", method=True):
+        fields = [(field["name"], field.get("type"))
+                  for field in form.find_all(["input", "textarea"]) if field.has_attr("name")]
+        forms.append({'method': form["method"], 'action': form.get("action"), 'fields': fields})
+
+    links = [a["href"] for a in soup.find_all("a", href=True)]
+    scripts = [script.string for script in soup.find_all("script") if script.string]
+    handlers = [value for tag in soup.find_all() for attr, value in tag.attrs.items()
+                if attr.startswith("on")]
+
+    page = PageModel(url, forms, links, scripts, handlers)
+
+    if dom:
+        # Imported here: lib.dom_xss uses this module for its own parsing
+        if _detector is None:
+            from lib.dom_xss import DOMXSSDetector
+            _detector = DOMXSSDetector()
+        vulnerabilities, incomplete = _detector.analyze_scripts(scripts + handlers)
+        page.dom = {
+            'analysis': _detector.detect_dom_sources_and_sinks(html, page.javascript),
+            'vulnerabilities': vulnerabilities,
+            'incomplete': incomplete
+        }
+
+    return page
+
+
+class AnalysisPool:
+    """
+    Process pool for page analysis
+
+    Args:
+        workers (int): Worker processes, 0 parses in the calling thread
+
+    Example:
+        >>> pool = AnalysisPool(os.cpu_count())
+        >>> page = pool.parse(url, response.text)
+        >>> pool.shutdown()
+    """
+
+    _inline = None
+
+    def __init__(self, workers=0):
+        self.workers = max(0, int(workers or 0))
+        self.executor = None
+        if self.workers:
+            # spawn: forking a process that already runs I/O threads is unsafe
+            context = multiprocessing.get_context("spawn")
+            self.executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=context)
+
+    @classmethod
+    def inline(cls):
+        """
+        Returns:
+            AnalysisPool: Shared pool without worker processes
+        """
+        if cls._inline is None:
+            cls._inline = cls(0)
+        return cls._inline
+
+    @staticmethod
+    def default_workers():
+        return os.cpu_count() or 1
+
+    def submit(self, url, html, dom=False):
+        """
+        Queue a page for analysis
+
+        Returns:
+            concurrent.futures.Future: Resolves to a PageModel
+        """
+        if self.executor is None:
+            future = Future()
+            try:
+                future.set_result(parse_page(url, html, dom))
+            except Exception as e:
+                future.set_exception(e)
+            return future
+        return self.executor.submit(parse_page, url, html, dom)
+
+    def parse(self, url, html, dom=False):
+        """
+        Analyse a page and wait for the result
+
+        Returns:
+            PageModel: Compact page model
+        """
+        return self.submit(url, html, dom).result()
+
+    def shutdown(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
+            self.executor = None
@@ -0,0 +1,293 @@
+"""
+Scan Budget Module for XSSProbe
+Request, byte and wall-clock limits per scan and per host
+
+A ScanBudget is charged by BudgetAdapter, a requests transport adapter
+wrapped around the session's real one, so every request of a scan
+(crawl, probes, payloads, DOM checks) is counted and refused once a limit
+is reached. Its pressure, the used fraction of the tightest limit, lets
+the scanner degrade step by step before that happens (see STEPS) and
+record the coverage it gave up in `sacrificed`.
+
+Example:
+    >>> budget = ScanBudget(max_requests=20000, max_seconds=1800)
+    >>> sess.mount("http://", BudgetAdapter(budget))
+"""
+
+import re
+import threading
+import time
+from urllib.parse import urlsplit, parse_qsl
+from requests.adapters import BaseAdapter, HTTPAdapter
+from requests.exceptions import ConnectionError as HTTPConnectionError, Timeout
+
+
+class BudgetExhausted(Exception):
+    """A scan or host limit was reached; raised instead of sending the request"""
+
+
+def host_of(url):
+    return urlsplit(url).netloc.lower()
+
+
+def endpoint_cluster(url):
+    """
+    Group URLs that most likely hit the same handler
+
+    Numeric path segments are collapsed and only the query parameter
+    names are kept, so /item/12?id=3 and /item/97?id=8 share a cluster.
+
+    Args:
+        url (str): Page URL
+
+    Returns:
+        tuple: Cluster key
+    """
+    parts = urlsplit(url)
+    path = re.sub(r"\d+", "{n}", parts.path or "/")
+    names = sorted({name for name, _ in parse_qsl(parts.query, keep_blank_values=True)})
+    return (parts.netloc.lower(), path, tuple(names))
+
+
+class ScanBudget:
+    """
+    Limits of one scan, all optional
+
+    Args:
+        max_requests (int): Requests for the whole scan
+        max_bytes (int): Response body bytes for the whole scan
+        max_seconds (float): Wall-clock seconds from start()
+        host_requests (int): Requests per host
+        host_bytes (int): Response body bytes per host
+        host_seconds (float): Seconds spent waiting on each host
+
+    Attributes:
+        sacrificed (dict): Coverage given up, counted by kind
+    """
+
+    # Pressure at which each degradation step starts
+    STEPS = {
+        'payloads': 0.5,   # fewer payloads per injection point, no generated variants
+        'dom': 0.7,        # DOM XSS static analysis only, no payload confirmation
+        'sample': 0.85     # one page per endpoint cluster
+    }
+
+    def __init__(self, max_requests=None, max_bytes=None, max_seconds=None,
+                 host_requests=None, host_bytes=None, host_seconds=None):
+        self.limits = {'requests': max_requests, 'bytes': max_bytes, 'seconds': max_seconds}
+        self.host_limits = {'requests': host_requests, 'bytes': host_bytes, 'seconds': host_seconds}
+        self.used = {'requests': 0, 'bytes': 0}
+        self.hosts = {}
+        self.sacrificed = {}
+        self.started = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config):
+        """
+        Returns:
+            ScanBudget: Budget described by a ScanConfig
+        """
+        return cls(config.max_requests, config.max_bytes, config.max_seconds,
+                   config.host_requests, config.host_bytes, config.host_seconds)
+
+    @property
+    def limited(self):
+        return any(limit is not None for limit in list(self.limits.values()) + list(self.host_limits.values()))
+
+    def start(self):
+        """Start the wall clock (the first request starts it otherwise)"""
+        if self.started is None:
+            self.started = time.monotonic()
+
+    def elapsed(self):
+        return 0.0 if self.started is None else time.monotonic() - self.started
+
+    def _host(self, host):
+        if host not in self.hosts:
+            self.hosts[host] = {'requests': 0, 'bytes': 0, 'seconds': 0.0}
+        return self.hosts[host]
+
+    def _fractions(self, host):
+        used = dict(self.used, seconds=self.elapsed())
+        fractions = {'scan ' + kind: used[kind] / limit
+                     for kind, limit in self.limits.items() if limit}
+        if host is not None:
+            host_used = self.hosts.get(host, {'requests': 0, 'bytes': 0, 'seconds': 0.0})
+            fractions.update({host + ' ' + kind: host_used[kind] / limit
+                              for kind, limit in self.host_limits.items() if limit})
+        return fractions
+
+    def pressure(self, host=None):
+        """
+        Args:
+            host (str): Also weigh this host's limits
+
+        Returns:
+            float: Used fraction of the tightest limit, 0 when unlimited
+        """
+        with self._lock:
+            return max(self._fractions(host).values(), default=0.0)
+
+    def exhausted(self, host=None):
+        """
+        Returns:
+            str: The limit that was reached, or None
+        """
+        with self._lock:
+            for name, fraction in self._fractions(host).items():
+                if fraction >= 1:
+                    return name + " budget exhausted"
+        return None
+
+    def remaining(self, host=None):
+        """
+        Returns:
+            float: Seconds left before a time limit is reached, None without time limits
+        """
+        with self._lock:
+            left = []
+            if self.limits['seconds']:
+                left.append(self.limits['seconds'] - self.elapsed())
+            if host is not None and self.host_limits['seconds']:
+                left.append(self.host_limits['seconds'] - self.hosts.get(host, {}).get('seconds', 0.0))
+        return min(left) if left else None
+
+    def degraded(self, step, host=None):
+        """
+        Returns:
+            bool: True if the pressure calls for degradation `step`
+        """
+        return self.pressure(host) >= self.STEPS[step]
+
+    def acquire(self, host):
+        """
+        Account for a request about to be sent
+
+        Raises:
+            BudgetExhausted: If a scan or host limit was reached
+        """
+        self.start()
+        # Checked and counted together, so concurrent fetches cannot overshoot a limit
+        with self._lock:
+            for name, fraction in self._fractions(host).items():
+                if fraction >= 1:
+                    raise BudgetExhausted(name + " budget exhausted")
+            self.used['requests'] += 1
+            self._host(host)['requests'] += 1
+
+    def charge(self, host, size, seconds):
+        """Account for a received response of `size` bytes"""
+        with self._lock:
+            self.used['bytes'] += size
+            usage = self._host(host)
+            usage['bytes'] += size
+            usage['seconds'] += seconds
+
+    def sacrifice(self, kind, count=1):
+        """Record coverage given up to stay within the budget"""
+        with self._lock:
+            self.sacrificed[kind] = self.sacrificed.get(kind, 0) + count
+
+    def report(self):
+        """
+        Returns:
+            dict: Limits, usage, the limit reached (if any) and sacrificed coverage
+        """
+        reason = self.exhausted()
+        with self._lock:
+            return {
+                'limits': {kind: limit for kind, limit in self.limits.items() if limit is not None},
+                'host_limits': {kind: limit for kind, limit in self.host_limits.items() if limit is not None},
+                'used': dict(self.used, seconds=round(self.elapsed(), 3)),
+                'hosts': {host: dict(usage, seconds=round(usage['seconds'], 3))
+                          for host, usage in self.hosts.items()},
+                'exhausted': reason,
+                'sacrificed': dict(self.sacrificed)
+            }
+
+
+class BudgetAdapter(BaseAdapter):
+    """
+    Transport adapter charging every request to a ScanBudget
+
+    With a time limit the request timeout is clamped to the time left and
+    the body is read in chunks against the same deadline, so a slow or
+    tarpitting endpoint cannot hold the scan past it.
+
+    Args:
+        budget (ScanBudget): Budget to charge
+        adapter (BaseAdapter): Adapter doing the actual transport, a new
+            HTTPAdapter if None
+    """
+
+    chunk_size = 64 * 1024
+
+    def __init__(self, budget, adapter=None):
+        super().__init__()
+        self.budget = budget
+        self.owned = adapter is None
+        self.adapter = adapter if adapter is not None else HTTPAdapter()
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        host = host_of(request.url)
+        self.budget.acquire(host)
+
+        remaining = self.budget.remaining(host)
+        clamped = False
+        if remaining is not None:
+            limited = self._clamp(timeout, remaining)
+            clamped, timeout = limited != timeout, limited
+
+        started = time.monotonic()
+        size = 0
+        try:
+            response = self.adapter.send(request, stream=True, timeout=timeout, verify=verify,
+                                         cert=cert, proxies=proxies)
+            if stream:
+                size = int(response.headers.get("Content-Length") or 0)
+            else:
+                size = self._read(response, None if remaining is None else started + remaining)
+        except (Timeout, HTTPConnectionError) as e:
+            # The clamped timeout fired, or the body read timed out: the time budget is spent
+            if clamped and (isinstance(e, Timeout) or "timed out" in str(e).lower()):
+                raise BudgetExhausted("time budget exhausted waiting for " + host) from e
+            raise
+        finally:
+            self.budget.charge(host, size, time.monotonic() - started)
+        return response
+
+    @staticmethod
+    def _clamp(timeout, remaining):
+        """Limit a requests timeout (number or (connect, read) tuple) to `remaining`"""
+        remaining = max(remaining, 0.001)
+        if isinstance(timeout, tuple):
+            return tuple(remaining if t is None else min(t, remaining) for t in timeout)
+        return remaining if timeout is None else min(timeout, remaining)
+
+    def _read(self, response, deadline):
+        """Read the body into response.content, giving up at `deadline`"""
+        # read1() returns whatever has arrived, so a trickling body cannot
+        # block past the deadline (urllib3 2.x; older versions read it whole)
+        read = getattr(response.raw, "read1", None)
+        if deadline is None or read is None:
+            return len(response.content)
+
+        chunks = []
+        while True:
+            chunk = read(self.chunk_size, decode_content=True)
+            if not chunk:
+                break
+            chunks.append(chunk)
+            if time.monotonic() > deadline:
+                response.close()
+                raise BudgetExhausted("time budget exhausted reading " + response.url)
+        response._content = b"".join(chunks)
+        response._content_consumed = True
+        response.close()
+        return len(response._content)
+
+    def close(self):
+        # A shared adapter (daemon connection pool) outlives this scan
+        if self.owned:
+            self.adapter.close()
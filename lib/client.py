@@ -0,0 +1,94 @@
+"""
+Daemon Client for XSSProbe
+Thin client for the job API served by `xssprobe.py --serve`
+
+Only the standard library is used, so submitting a scan to a running
+daemon does not pay for importing requests, bs4 or the scanner itself.
+
+Example:
+    >>> client = XSSProbeClient("http://127.0.0.1:8777")
+    >>> job_id = client.submit({"url": "http://testphp.vulnweb.com", "depth": 1})
+    >>> for event in client.events(job_id):
+    ...     print(event)
+"""
+
+import json
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
+from lib.event import ScanEvent
+
+
+class XSSProbeClient:
+    """
+    Client for one daemon
+
+    Args:
+        base_url (str): Daemon address, e.g. http://127.0.0.1:8777
+        timeout (float): Socket timeout for non-streaming calls
+    """
+
+    def __init__(self, base_url, timeout=30):
+        if "://" not in base_url:
+            base_url = "http://" + base_url
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+
+    def _call(self, method, path, body=None):
+        data = json.dumps(body).encode() if body is not None else None
+        request = Request(self.base_url + path, data=data, method=method,
+                          headers={"Content-Type": "application/json"})
+        try:
+            with urlopen(request, timeout=self.timeout) as response:
+                return json.loads(response.read())
+        except HTTPError as e:
+            raise RuntimeError("%s %s: %s" % (method, path, e.read().decode(errors="replace")))
+
+    def submit(self, config):
+        """
+        Submit a scan
+
+        Args:
+            config (dict): ScanConfig fields (url is required)
+
+        Returns:
+            str: Job id
+        """
+        return self._call("POST", "/scans", config)['id']
+
+    def status(self, job_id):
+        """
+        Returns:
+            dict: Job status, config and findings so far
+        """
+        return self._call("GET", "/scans/" + job_id)
+
+    def jobs(self):
+        """
+        Returns:
+            list: Jobs known to the daemon
+        """
+        return self._call("GET", "/scans")['jobs']
+
+    def cancel(self, job_id):
+        """
+        Returns:
+            dict: Job id and status after cancelling
+        """
+        return self._call("DELETE", "/scans/" + job_id)
+
+    def events(self, job_id, since=0):
+        """
+        Stream a job's events until it finishes
+
+        Args:
+            job_id (str): Job id
+            since (int): Skip the first `since` events
+
+        Yields:
+            ScanEvent: Events as the daemon produces them
+        """
+        url = "%s/scans/%s/events?since=%d" % (self.base_url, job_id, since)
+        with urlopen(url) as response:
+            for line in response:
+                if line.strip():
+                    yield ScanEvent.from_dict(json.loads(line))
@@ -1,74 +1,104 @@
+import requests
 from lib.helper.helper import *
 from random import randint
-from bs4 import BeautifulSoup
-from urllib.parse import urljoin,urlparse,parse_qs,urlencode
+from urllib.parse import urljoin,urlparse,parse_qs
 from lib.helper.Log import *
 from lib.dom_xss import DOMXSSDetector
+from lib.probe import FilterProbe
+from lib.payloads import PayloadLibrary
+from lib.event import ScanEvent
+from lib.analysis import parse_page
 from requests.packages.urllib3.exceptions import InsecureRequestWarning
 requests.packages.urllib3.disable_warnings(InsecureRequestWarning)
 
 class core:
 	
+	# Payloads tried per injection point before giving up
+	max_payloads=10
+	# Fall back to generated encoding variants after the corpus payloads
+	variants=True
+	
 	@classmethod
 	def main(cls, url, proxy, user_agent, payload, cookie, method):
 		"""Main scanning method for XSS vulnerabilities"""
-		global cookies, payloads, user_agents, proxies, target
-		target = url
-		cookies = cookie
-		payloads = payload
-		user_agents = user_agent
-		proxies = proxy
-		
 		scanner = cls()
-		scanner.scan_target(url, proxy, user_agent, payload, cookie, method)
+		for event in scanner.scan_target(url, proxy, user_agent, payload, cookie, method):
+			if event.kind == ScanEvent.FINDING:
+				cls.save_finding(event)
 	
-	def __init__(self):
+	@staticmethod
+	def save_finding(event):
+		"""Append a reflected XSS finding to xss.txt"""
+		file = open("xss.txt", "a")
+		file.write(str(event.data["url"])+"\n\n")
+		file.close()
+	
+	def __init__(self, probe=None, library=None):
 		"""Initialize core scanner"""
-		pass
+		self.probe = probe if probe is not None else FilterProbe()
+		self.library = library if library is not None else PayloadLibrary.default()
 	
 	def scan_target(self, url, proxy, user_agent, payload, cookie, method):
-		"""Scan target URL for XSS vulnerabilities"""
-		global cookies, payloads, user_agents, proxies, target
-		target = url
-		cookies = cookie
-		payloads = payload
-		user_agents = user_agent
-		proxies = proxy
-		
+		"""Scan target URL for XSS vulnerabilities, yielding ScanEvent objects"""
 		try:
-			Log.info("Testing target: " + url)
 			headers = user_agent if isinstance(user_agent, dict) else {'User-Agent': user_agent}
 			proxies_dict = eval(proxy) if proxy else None
 			
 			sess = session(proxies_dict, headers, cookie)
 			ctr = sess.get(url, timeout=10, verify=False)
-			self.body = ctr.text
 		except Exception as e:
 			Log.high("Internal error: "+str(e))
+			yield ScanEvent.error(str(e), url=url)
 			return
 		
+		yield from self.scan_page(url, ctr, sess, payload, method)
+	
+	def scan_page(self, url, ctr, sess, payload, method, page=None):
+		"""
+		Test the forms and links of an already fetched page
+		
+		Args:
+			url (str): Page URL
+			ctr: Response the page was fetched with
+			sess: Requests session used for the attack requests
+			payload (str): Forced payload, None for ranked corpus payloads
+			method (int): 0 GET, 1 POST, 2 both
+			page (PageModel): Page already parsed by an AnalysisPool, parsed here if None
+			
+		Yields:
+			ScanEvent: Progress events and findings
+		"""
+		Log.info("Testing target: " + url)
 		if ctr.status_code > 400:
 			Log.info("Connection failed "+G+str(ctr.status_code))
+			yield ScanEvent.error("Connection failed", url=url, status=ctr.status_code)
 			return 
 		else:
 			Log.info("Connection estabilished "+G+str(ctr.status_code))
 		
+		yield ScanEvent.progress("page", url=url, status=ctr.status_code)
+		
 		# Set instance variables for use by other methods
+		self.body = ctr.text
+		self.page = page if page is not None else parse_page(url, ctr.text)
 		self.url = url
 		self.payload = payload
 		self.session = sess
 		
-		if method >= 2:
-			self.post_method()
-			self.get_method()
-			self.get_method_form()
-			
-		elif method == 1:
-			self.post_method()
-			
-		elif method == 0:
-			self.get_method()
-			self.get_method_form()
+		try:
+			if method >= 2:
+				yield from self.post_method()
+				yield from self.get_method()
+				yield from self.get_method_form()
+				
+			elif method == 1:
+				yield from self.post_method()
+				
+			elif method == 0:
+				yield from self.get_method()
+				yield from self.get_method_form()
+		finally:
+			self.library.save()
 	
 	@classmethod
 	def generate(self,eff):		
@@ -98,120 +128,157 @@ class core:
 			return "<script>"+FUNCTION[randint(0,4)]+"</script>"
 			
 	def post_method(self):
-		bsObj=BeautifulSoup(self.body,"html.parser")
-		forms=bsObj.find_all("form",method=True)
-		
-		for form in forms:
-			try:
-				action=form["action"]
-			except KeyError:
+		for form in self.page.forms:
+			action=form["action"]
+			if action is None:
 				action=self.url
 				
 			if form["method"].lower().strip() == "post":
 				Log.warning("Target have form with POST method: "+C+urljoin(self.url,action))
 				Log.info("Collecting form input key.....")
 				
-				keys={}
-				for key in form.find_all(["input","textarea"]):
-					try:
-						if key["type"] == "submit":
-							Log.info("Form key name: "+G+key["name"]+N+" value: "+G+"<Submit Confirm>")
-							keys.update({key["name"]:key["name"]})
-				
-						else:
-							Log.info("Form key name: "+G+key["name"]+N+" value: "+G+self.payload)
-							keys.update({key["name"]:self.payload})
-							
-					except Exception as e:
-						Log.info("Internal error: "+str(e))
-				
-				Log.info("Sending payload (POST) method...")
-				req=self.session.post(urljoin(self.url,action),data=keys)
-				if self.payload in req.text:
+				injected,fixed=self.form_keys(form)
+				result=yield from self.attack("POST",urljoin(self.url,action),injected,fixed)
+				if result:
+					req,payload,keys=result
 					Log.high("Detected XSS (POST) at "+urljoin(self.url,req.url))
-					file = open("xss.txt", "a")
-					file.write(str(req.url)+"\n\n")
-					file.close()
 					Log.high("Post data: "+str(keys))
+					yield ScanEvent.finding("Reflected XSS",req.url,method="POST",payload=payload,data=keys)
 				else:
 					Log.info("Parameter page using (POST) payloads but not 100% yet...")
 	
 	def get_method_form(self):
-		bsObj=BeautifulSoup(self.body,"html.parser")
-		forms=bsObj.find_all("form",method=True)
-		
-		for form in forms:
-			try:
-				action=form["action"]
-			except KeyError:
+		for form in self.page.forms:
+			action=form["action"]
+			if action is None:
 				action=self.url
 				
 			if form["method"].lower().strip() == "get":
 				Log.warning("Target have form with GET method: "+C+urljoin(self.url,action))
 				Log.info("Collecting form input key.....")
 				
-				keys={}
-				for key in form.find_all(["input","textarea"]):
-					try:
-						if key["type"] == "submit":
-							Log.info("Form key name: "+G+key["name"]+N+" value: "+G+"<Submit Confirm>")
-							keys.update({key["name"]:key["name"]})
-				
-						else:
-							Log.info("Form key name: "+G+key["name"]+N+" value: "+G+self.payload)
-							keys.update({key["name"]:self.payload})
-							
-					except Exception as e:
-						Log.info("Internal error: "+str(e))
-						try:
-							Log.info("Form key name: "+G+key["name"]+N+" value: "+G+self.payload)
-							keys.update({key["name"]:self.payload})
-						except KeyError as e:
-							Log.info("Internal error: "+str(e))
-						
-				Log.info("Sending payload (GET) method...")
-				req=self.session.get(urljoin(self.url,action),params=keys)
-				if self.payload in req.text:
+				injected,fixed=self.form_keys(form)
+				result=yield from self.attack("GET",urljoin(self.url,action),injected,fixed)
+				if result:
+					req,payload,keys=result
 					Log.high("Detected XSS (GET) at "+urljoin(self.url,req.url))
-					file = open("xss.txt", "a")
-					file.write(str(req.url)+"\n\n")
-					file.close()
 					Log.high("GET data: "+str(keys))
+					yield ScanEvent.finding("Reflected XSS",req.url,method="GET",payload=payload,data=keys)
 				else:
 					Log.info("\033[0;35;47m Parameter page using (GET) payloads but not 100% yet...")
 		
 	def get_method(self):
-		bsObj=BeautifulSoup(self.body,"html.parser")
-		links=bsObj.find_all("a",href=True)
-		for a in links:
-			url=a["href"]
+		for url in self.page.links:
 			if url.startswith("http://") is False or url.startswith("https://") is False or url.startswith("mailto:") is False:
-				base=urljoin(self.url,a["href"])
+				base=urljoin(self.url,url)
 				query=urlparse(base).query
 				if query != "":
 					Log.warning("Found link with query: "+G+query+N+" Maybe a vuln XSS point")
 					
-					query_payload=query.replace(query[query.find("=")+1:len(query)],self.payload,1)
-					test=base.replace(query,query_payload,1)
-					
-					query_all=base.replace(query,urlencode({x: self.payload for x in parse_qs(query)}))
-					
-					Log.info("Query (GET) : "+test)
-					Log.info("Query (GET) : "+query_all)
-
-					if not url.startswith("mailto:") and not url.startswith("tel:"):					
-						_respon=self.session.get(test,verify=False)
-						if self.payload in _respon.text or self.payload in self.session.get(query_all).text:
+					if not url.startswith("mailto:") and not url.startswith("tel:"):
+						result=yield from self.attack("GET",base.split("?")[0],list(parse_qs(query)),{})
+						if result:
+							_respon,payload,keys=result
 							Log.high("Detected XSS (GET) at "+_respon.url)
-							file = open("xss.txt", "a")
-							file.write(str(_respon.url)+"\n\n")
-							file.close()
+							yield ScanEvent.finding("Reflected XSS",_respon.url,method="GET",payload=payload,data=keys)
 						
 						else:
 							Log.info("Parameter page using (GET) payloads but not 100% yet...")
 					else:
 						Log.info("URL is not an HTTP url, ignoring")
 	
+	def form_keys(self,form):
+		"""
+		Split form fields into injectable ones and fixed ones
+		
+		Args:
+			form (dict): Form from a PageModel
+			
+		Returns:
+			tuple: (list of injectable field names, dict of fixed fields)
+		"""
+		injected=[]
+		fixed={}
+		for name,kind in form["fields"]:
+			if kind == "submit":
+				Log.info("Form key name: "+G+name+N+" value: "+G+"<Submit Confirm>")
+				fixed.update({name:name})
+			else:
+				Log.info("Form key name: "+G+name+N+" value: "+G+"<Payload>")
+				injected.append(name)
+				
+		return injected,fixed
+	
+	def candidates(self,profiles):
+		"""
+		Payloads worth sending to an injection point, best first
+		
+		Args:
+			profiles (dict): Filter probe result for the endpoint
+			
+		Returns:
+			tuple: (reflection context, iterable of payload strings)
+		"""
+		reflecting=[profile for profile in profiles.values() if profile.reflected]
+		profile=max(reflecting,key=lambda p: len(p.survived)) if reflecting else None
+		context=profile.context if profile else "html"
+		
+		if self.payload is not None:
+			if FilterProbe.allows_any(profiles,self.payload):
+				return context,[self.payload]
+			Log.info("Payload characters are filtered, skipping")
+			return context,[]
+		
+		if profiles and profile is None:
+			Log.info("Probe is not reflected by any parameter, skipping")
+			return context,[]
+			
+		return context,self.library.candidates(context,profile,limit=self.max_payloads,variants=self.variants)
+	
+	def attack(self,method,url,injected,fixed):
+		"""
+		Probe an endpoint, then send ranked payloads until one is reflected
+		
+		Args:
+			method (str): GET or POST
+			url (str): Endpoint URL
+			injected (list): Field names receiving the payload
+			fixed (dict): Fields sent unchanged
+			
+		Yields:
+			ScanEvent: A progress event per request sent
+			
+		Returns:
+			tuple: (response, payload, sent fields) of the first hit, or None
+		"""
+		if not injected:
+			return None
+		
+		yield ScanEvent.progress("probe",url=url,method=method,params=injected)
+		profiles=self.probe.fingerprint(self.session,method,url,injected,fixed)
+		for name,profile in profiles.items():
+			Log.info("Filter probe "+G+name+N+": "+str(profile))
+			
+		context,payloads=self.candidates(profiles)
+		for payload in payloads:
+			keys=dict(fixed)
+			keys.update({name:payload for name in injected})
+			
+			Log.info("Sending payload ("+method+"): "+G+payload)
+			yield ScanEvent.progress("payload",url=url,method=method,payload=payload)
+			if method == "POST":
+				req=self.session.post(url,data=keys,verify=False)
+			else:
+				req=self.session.get(url,params=keys,verify=False)
+				
+			hit=payload in req.text
+			if self.payload is None:
+				self.library.record(payload,context,hit)
+			if hit:
+				return req,payload,keys
+				
+		return None
+	
 	def dom_xss_scan(self):
 		"""
 		Perform DOM XSS vulnerability scanning
@@ -13,18 +13,43 @@ class crawler:
 	@classmethod
 	def getLinks(self,base,proxy,headers,cookie):
 
-		lst=[]
-	
 		conn=session(proxy,headers,cookie)
 		text=conn.get(base).text
+		return self.extractLinks(base,text,self.visited)
+
+	@classmethod
+	def extractLinks(self,base,text,visited):
+		"""
+		Collect same-site links from a page that were not seen yet
+		
+		Args:
+			base (str): URL the page was fetched from
+			text (str): Page HTML
+			visited: List or set of already collected URLs, updated in place
+			
+		Returns:
+			list: New absolute URLs
+		"""
 		isi=BeautifulSoup(text,"html.parser")
-	
+		return self.filterLinks(base,[obj["href"] for obj in isi.find_all("a",href=True)],visited)
+
+	@classmethod
+	def filterLinks(self,base,hrefs,visited):
+		"""
+		Same as extractLinks, for hrefs already taken from a PageModel
 		
-		for obj in isi.find_all("a",href=True):
-			url=obj["href"]
+		Args:
+			base (str): URL the page was fetched from
+			hrefs (list): Raw href values
+			visited: List or set of already collected URLs, updated in place
 			
+		Returns:
+			list: New absolute URLs
+		"""
+		lst=[]
+		for url in hrefs:
 			
-			if urljoin(base,url) in self.visited:
+			if urljoin(base,url) in visited:
 				continue
 
 			elif url.startswith("mailto:") or url.startswith("javascript:"):
@@ -32,7 +57,10 @@ class crawler:
 	# :// will check if there any subdomain or any other domain but it will pass directory		
 			elif url.startswith(base) or "://" not in url :
 				lst.append(urljoin(base,url))
-				self.visited.append(urljoin(base,url))
+				if isinstance(visited,set):
+					visited.add(urljoin(base,url))
+				else:
+					visited.append(urljoin(base,url))
 			
 		return lst
 
@@ -8,10 +8,12 @@ to the DOM without proper sanitization.
 
 import re
 import requests
-from bs4 import BeautifulSoup
 from urllib.parse import urljoin, urlparse, parse_qs, urlencode
 from lib.helper.Log import Log
 from lib.helper.helper import session
+from lib.payloads import PayloadLibrary
+from lib.analysis import AnalysisPool
+from lib.jsflow import TaintAnalyzer, CODE_SINKS
 
 class DOMXSSDetector:
     """
@@ -24,7 +26,10 @@ class DOMXSSDetector:
     4. Simulating client-side execution patterns
     """
     
-    def __init__(self):
+    def __init__(self, library=None, pool=None):
+        # Where HTML parsing runs, in-process unless a worker pool is given
+        self.pool = pool if pool is not None else AnalysisPool.inline()
+        
         # JavaScript sources that can contain user input
         self.dom_sources = [
             'document.URL',
@@ -70,34 +75,12 @@ class DOMXSSDetector:
             'history.replaceState'
         ]
         
-        # DOM XSS test payloads
-        self.dom_payloads = [
-            # Hash-based payloads
-            "#<script>alert('DOM_XSS')</script>",
-            "#<img src=x onerror=alert('DOM_XSS')>",
-            "#<svg onload=alert('DOM_XSS')>",
-            
-            # JavaScript protocol
-            "javascript:alert('DOM_XSS')",
-            
-            # Event handler payloads
-            "#onmouseover=alert('DOM_XSS')",
-            "#'><script>alert('DOM_XSS')</script>",
-            
-            # URL parameter simulation
-            "?param=<script>alert('DOM_XSS')</script>",
-            
-            # Advanced DOM payloads
-            "#<iframe src=javascript:alert('DOM_XSS')>",
-            "#<object data=javascript:alert('DOM_XSS')>",
-            "#<embed src=javascript:alert('DOM_XSS')>",
-            
-            # AngularJS template injection
-            "#{{constructor.constructor('alert(\"DOM_XSS\")')()}}",
-            
-            # React XSS patterns
-            "#<div dangerouslySetInnerHTML={{__html: '<script>alert(\"DOM_XSS\")</script>'}} />",
-        ]
+        # Source-to-sink dataflow analysis of inline scripts
+        self.taint = TaintAnalyzer(self.dom_sources, self.dom_sinks)
+        
+        # DOM XSS test payloads, ranked by past success
+        self.library = library if library is not None else PayloadLibrary.default()
+        self.dom_payloads = self.library.texts('dom')
 
     def detect_dom_sources_and_sinks(self, html_content, js_content=""):
         """
@@ -142,71 +125,51 @@ class DOMXSSDetector:
         Returns:
             str: Extracted JavaScript code
         """
-        soup = BeautifulSoup(html_content, 'html.parser')
-        js_code = ""
-        
-        # Extract inline JavaScript
-        for script in soup.find_all('script'):
-            if script.string:
-                js_code += script.string + "\n"
-                
-        # Extract event handlers
-        for tag in soup.find_all():
-            for attr in tag.attrs:
-                if attr.startswith('on'):  # onclick, onload, etc.
-                    js_code += tag.attrs[attr] + "\n"
-                    
-        return js_code
+        return self.pool.parse(None, html_content).javascript
 
     def analyze_javascript_patterns(self, js_content):
         """
-        Analyze JavaScript for DOM XSS vulnerability patterns
+        Analyze JavaScript for source-to-sink data flows
+        
+        Each script goes through the taint analyzer (lib/jsflow.py), which
+        caches results by script hash, so pass scripts separately when you
+        have them to avoid re-analysing ones shared between pages.
         
         Args:
-            js_content (str): JavaScript content to analyze
+            js_content (str or list): JavaScript content, or a list of scripts
             
         Returns:
-            list: List of potential vulnerabilities found
+            list: List of potential vulnerabilities found, each with its flow path
+        """
+        return self.analyze_scripts(js_content)[0]
+
+    def analyze_scripts(self, js_content):
+        """
+        Like analyze_javascript_patterns, also counting scripts the analyzer
+        could not finish (over its size or step budget)
+        
+        Returns:
+            tuple: (list of vulnerabilities, number of incompletely analysed scripts)
         """
+        scripts = [js_content] if isinstance(js_content, str) else js_content
         vulnerabilities = []
+        incomplete = 0
         
-        # Pattern 1: Direct location.hash usage
-        if re.search(r'location\.hash.*innerHTML|document\.write.*location\.hash', js_content, re.IGNORECASE):
-            vulnerabilities.append({
-                'type': 'DOM XSS',
-                'pattern': 'location.hash to innerHTML/document.write',
-                'severity': 'HIGH',
-                'description': 'Direct use of location.hash in DOM manipulation'
-            })
+        for script in scripts:
+            result = self.taint.analyze(script)
+            if not result.complete:
+                incomplete += 1
+            for flow in result.flows:
+                vulnerabilities.append({
+                    'type': 'DOM XSS',
+                    'pattern': f"{flow['source']} to {flow['sink']}",
+                    'severity': 'CRITICAL' if flow['sink'] in CODE_SINKS else 'HIGH',
+                    'description': f"User-controlled {flow['source']} reaches {flow['sink']} "
+                                   f"(script line {flow['line']})",
+                    'path': flow['path']
+                })
             
-        # Pattern 2: URL parameter to DOM
-        if re.search(r'document\.URL.*innerHTML|window\.location.*innerHTML', js_content, re.IGNORECASE):
-            vulnerabilities.append({
-                'type': 'DOM XSS', 
-                'pattern': 'URL to innerHTML',
-                'severity': 'HIGH',
-                'description': 'URL content directly inserted into DOM'
-            })
-            
-        # Pattern 3: Eval with user input
-        if re.search(r'eval.*location\.|eval.*document\.URL', js_content, re.IGNORECASE):
-            vulnerabilities.append({
-                'type': 'DOM XSS',
-                'pattern': 'eval() with user input',
-                'severity': 'CRITICAL', 
-                'description': 'eval() function using user-controlled input'
-            })
-            
-        # Pattern 4: setTimeout/setInterval with user input
-        if re.search(r'setTimeout.*location\.|setInterval.*document\.URL', js_content, re.IGNORECASE):
-            vulnerabilities.append({
-                'type': 'DOM XSS',
-                'pattern': 'setTimeout/setInterval with user input',
-                'severity': 'HIGH',
-                'description': 'Timer functions with user-controlled input'
-            })
-            
-        return vulnerabilities
+        return vulnerabilities, incomplete
 
     def test_dom_xss_payloads(self, target_url, session_obj):
         """
@@ -238,7 +201,9 @@ class DOMXSSDetector:
                 response = session_obj.get(test_url)
                 
                 # Analyze response for DOM XSS indicators
-                if self._check_dom_xss_response(response.text, payload):
+                hit = self._check_dom_xss_response(response.text, payload)
+                self.library.record(payload, 'dom', hit)
+                if hit:
                     successful_tests.append({
                         'url': test_url,
                         'payload': payload,
@@ -246,6 +211,8 @@ class DOMXSSDetector:
                         'type': 'DOM XSS'
                     })
                     Log.high(f"Potential DOM XSS found: {test_url}")
+                    # Payloads are ranked, one confirmation is enough
+                    break
                     
             except Exception as e:
                 Log.info(f"Error testing DOM payload {payload}: {str(e)}")
@@ -317,7 +284,14 @@ class DOMXSSDetector:
                 report += f"  • Type: {vuln['type']}\n"
                 report += f"    Pattern: {vuln['pattern']}\n"
                 report += f"    Severity: {vuln['severity']}\n"
-                report += f"    Description: {vuln['description']}\n\n"
+                report += f"    Description: {vuln['description']}\n"
+                if vuln.get('path'):
+                    report += f"    Flow: {' -> '.join(vuln['path'])}\n"
+                report += "\n"
+                
+        if findings.get('incomplete_scripts'):
+            report += f"⏳ Analysis incomplete for {findings['incomplete_scripts']} script(s) "
+            report += "(size or step budget), flows may be missing\n\n"
                 
         if findings.get('successful_tests'):
             report += "✅ Confirmed DOM XSS:\n"
@@ -328,7 +302,8 @@ class DOMXSSDetector:
                 
         return report
 
-    def scan_for_dom_xss(self, target_url, proxy=None, headers=None, cookie=None):
+    def scan_for_dom_xss(self, target_url, proxy=None, headers=None, cookie=None,
+                         session_obj=None, save=True, confirm=True, html=None, page=None):
         """
         Main DOM XSS scanning function
         
@@ -337,6 +312,11 @@ class DOMXSSDetector:
             proxy: Proxy configuration
             headers: HTTP headers
             cookie: Cookie string
+            session_obj: Existing requests session, overrides proxy/headers/cookie
+            save (bool): Append the report to dom_xss_results.txt
+            confirm (bool): Send DOM payloads to confirm the static findings
+            html (str): Already fetched page content; fetched here if None
+            page (PageModel): Already parsed `html`; parsed here if None
             
         Returns:
             dict: Complete DOM XSS analysis results
@@ -351,26 +331,36 @@ class DOMXSSDetector:
                 cookie = '{"session":"test"}'  # Default cookie
                 
             # Create session
-            session_obj = session(proxy, headers, cookie)
-            
-            # Get initial page content
-            response = session_obj.get(target_url)
-            html_content = response.text
+            if session_obj is None:
+                session_obj = session(proxy, headers, cookie)
             
-            # Extract JavaScript
-            js_content = self.extract_javascript(html_content)
+            # Get initial page content, unless the caller already has it
+            if html is None:
+                html = session_obj.get(target_url).text
+            html_content = html
             
-            # Analyze for sources and sinks
-            Log.info("Analyzing DOM sources and sinks...")
-            dom_analysis = self.detect_dom_sources_and_sinks(html_content, js_content)
+            # Extract JavaScript, analysed in a worker process when there is a pool
+            if page is None:
+                page = self.pool.parse(target_url, html_content, dom=self.pool.workers > 0)
+            js_content = page.javascript
             
-            # Analyze JavaScript patterns
-            Log.info("Analyzing JavaScript patterns...")
-            js_vulnerabilities = self.analyze_javascript_patterns(js_content)
+            Log.info("Analyzing DOM sources, sinks and JavaScript patterns...")
+            if page.dom:
+                dom_analysis = page.dom['analysis']
+                js_vulnerabilities = page.dom['vulnerabilities']
+                incomplete = page.dom['incomplete']
+            else:
+                dom_analysis = self.detect_dom_sources_and_sinks(html_content, js_content)
+                js_vulnerabilities, incomplete = self.analyze_scripts(page.scripts + page.handlers)
+            if incomplete:
+                Log.warning(f"JavaScript analysis incomplete for {incomplete} script(s), flows may be missing")
             
             # Test DOM XSS payloads
-            Log.info("Testing DOM XSS payloads...")
-            successful_tests = self.test_dom_xss_payloads(target_url, session_obj)
+            successful_tests = []
+            if confirm:
+                Log.info("Testing DOM XSS payloads...")
+                successful_tests = self.test_dom_xss_payloads(target_url, session_obj)
+                self.library.save()
             
             # Compile results
             findings = {
@@ -380,6 +370,7 @@ class DOMXSSDetector:
                 'potential_dom_xss': dom_analysis['potential_dom_xss'],
                 'vulnerabilities': js_vulnerabilities,
                 'successful_tests': successful_tests,
+                'incomplete_scripts': incomplete,
                 'has_dom_xss': len(successful_tests) > 0 or len(js_vulnerabilities) > 0
             }
             
@@ -388,7 +379,7 @@ class DOMXSSDetector:
             Log.info("DOM XSS scan completed")
             
             # Save results if vulnerabilities found
-            if findings['has_dom_xss']:
+            if save and findings['has_dom_xss']:
                 with open("dom_xss_results.txt", "a") as f:
                     f.write(report)
                     f.write("\n" + "="*60 + "\n")
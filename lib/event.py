@@ -0,0 +1,82 @@
+"""
+Scan Event Module for XSSProbe
+Events streamed by the scanner while a scan runs
+
+Every scan reports its progress and results as a sequence of ScanEvent
+objects instead of writing to stdout or files directly, so callers can
+consume them incrementally (CLI, embedding service, job API).
+"""
+
+import time
+
+
+class ScanEvent:
+    """
+    A single event emitted during a scan
+
+    Kinds:
+        progress  - a page, endpoint or payload is being tested
+        finding   - a confirmed or potential vulnerability
+        error     - a recoverable error (the scan goes on)
+        done      - the scan finished (or was cancelled)
+
+    Attributes:
+        kind (str): One of the kinds above
+        data (dict): Event details, JSON serialisable
+        time (float): Unix timestamp of the event
+    """
+
+    PROGRESS = "progress"
+    FINDING = "finding"
+    ERROR = "error"
+    DONE = "done"
+
+    def __init__(self, kind, **data):
+        self.kind = kind
+        self.data = data
+        self.time = time.time()
+
+    @classmethod
+    def progress(cls, stage, **data):
+        return cls(cls.PROGRESS, stage=stage, **data)
+
+    @classmethod
+    def finding(cls, type, url, **data):
+        return cls(cls.FINDING, type=type, url=url, **data)
+
+    @classmethod
+    def error(cls, message, **data):
+        return cls(cls.ERROR, message=message, **data)
+
+    def to_dict(self):
+        """
+        Serialise the event
+
+        Returns:
+            dict: {'kind': ..., 'time': ..., **data}
+        """
+        event = {'kind': self.kind, 'time': self.time}
+        event.update(self.data)
+        return event
+
+    @classmethod
+    def from_dict(cls, event):
+        """
+        Rebuild an event serialised with to_dict()
+
+        Args:
+            event (dict): Serialised event
+
+        Returns:
+            ScanEvent: Equivalent event
+        """
+        data = dict(event)
+        kind = data.pop('kind')
+        timestamp = data.pop('time', None)
+        rebuilt = cls(kind, **data)
+        if timestamp is not None:
+            rebuilt.time = timestamp
+        return rebuilt
+
+    def __repr__(self):
+        return "<ScanEvent %s %r>" % (self.kind, self.data)
@@ -1,17 +1,38 @@
 
 from lib.helper.helper import * 
+from contextlib import contextmanager
 from datetime import datetime
+import threading
 class Log:
 
+	# Per thread, so a quiet scan does not silence the ones running beside it
+	_local = threading.local()
+
+	@classmethod
+	@contextmanager
+	def silenced(self,quiet=True):
+		"""Drop the lines logged by the current thread inside the block"""
+		previous = getattr(self._local,"quiet",False)
+		self._local.quiet = previous or quiet
+		try:
+			yield
+		finally:
+			self._local.quiet = previous
+
+	@classmethod
+	def _print(self,line):
+		if not getattr(self._local,"quiet",False):
+			print(line)
+
 	@classmethod
 	def info(self,text):
-		print("["+Y+datetime.now().strftime("%H:%M:%S")+N+"] ["+G+"INFO"+N+"] "+text)
+		self._print("["+Y+datetime.now().strftime("%H:%M:%S")+N+"] ["+G+"INFO"+N+"] "+text)
  
 	@classmethod
 	def warning(self,text):
-		print("["+Y+datetime.now().strftime("%H:%M:%S")+N+"] ["+Y+"WARNING"+N+"] "+text)
+		self._print("["+Y+datetime.now().strftime("%H:%M:%S")+N+"] ["+Y+"WARNING"+N+"] "+text)
 
 	@classmethod
 	def high(self,text):
-		print("["+Y+datetime.now().strftime("%H:%M:%S")+N+"] ["+R+"CRITICAL"+N+"] "+text)
+		self._print("["+Y+datetime.now().strftime("%H:%M:%S")+N+"] ["+R+"CRITICAL"+N+"] "+text)
  		
\ No newline at end of file
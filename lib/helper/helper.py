@@ -1,5 +1,5 @@
 
-import requests, json
+import json
 ##### Warna ####### 
 N = '\033[0m'
 W = '\033[1;37m' 
@@ -15,11 +15,39 @@ underline = "\033[4m"
 agent = {'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_10_1) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/39.0.2171.95 Safari/537.36'} 
 line="—————————————————" 
 #####################
-def session(proxies,headers,cookie):
+def parse_cookie(cookie):
+	"""
+	Read cookies given as JSON or as a dict literal ({'ID':'1094200543'})
+	
+	Raises:
+		ValueError: If the value is neither
+		
+	Returns:
+		dict: Cookie name to value
+	"""
+	import ast
+	try:
+		cookies=json.loads(cookie)
+	except ValueError:
+		try:
+			cookies=ast.literal_eval(cookie)
+		except (ValueError,SyntaxError):
+			raise ValueError("cookie must be a JSON object, e.g. {\"ID\":\"1094200543\"}")
+	if not isinstance(cookies,dict):
+		raise ValueError("cookie must be a JSON object, e.g. {\"ID\":\"1094200543\"}")
+	return cookies
+
+def session(proxies,headers,cookie,adapter=None):
+	# Imported here so the CLI can start without loading requests
+	import requests
 	r=requests.Session()
 	r.proxies=proxies
 	r.headers=headers
 	r.cookies.update(json.loads(cookie))
+	if adapter is not None:
+		# Shared adapter: connection pools are reused across sessions
+		r.mount("http://",adapter)
+		r.mount("https://",adapter)
 	return r
 
 logo = G + """
@@ -0,0 +1,598 @@
+"""
+JavaScript Taint-Flow Module for XSSProbe
+Tracks DOM XSS sources through assignments to dangerous sinks
+
+A small pure-Python tokenizer turns a script into tokens in one pass,
+then an intra-script dataflow pass follows values read from DOM sources
+(location.hash, document.URL...) through variable and property
+assignments until they reach a sink (innerHTML, eval, document.write...).
+Each finding carries the flow path, e.g.
+
+    location.hash -> h -> y -> innerHTML
+
+The analysis is flow-insensitive within a script, ignores function
+boundaries and stops at known sanitizers. Every expression it inspects is
+capped in length and every script has a size and time budget, so the
+cost stays linear in the script size. Results are cached by script hash.
+"""
+
+import hashlib
+import re
+import threading
+import time
+from collections import OrderedDict
+
+# Longest first so '===' wins over '==' and '='
+PUNCTUATORS = sorted([
+    '>>>=', '...', '===', '!==', '**=', '<<=', '>>=', '>>>', '&&=', '||=', '??=',
+    '=>', '==', '!=', '<=', '>=', '&&', '||', '??', '?.', '++', '--', '+=', '-=',
+    '*=', '/=', '%=', '&=', '|=', '^=', '<<', '>>', '**'
+], key=len, reverse=True)
+
+# Candidates per first character, longest first
+PUNCTUATORS_BY_CHAR = {}
+for _punct in PUNCTUATORS:
+    PUNCTUATORS_BY_CHAR.setdefault(_punct[0], []).append(_punct)
+
+ASSIGNMENT_OPERATORS = ('=', '+=')
+
+# Tokens after which a '/' starts a regular expression, not a division
+REGEX_PREFIX = set('(,=:[!&|?{};+-*%<>~^') | {
+    'return', 'typeof', 'case', 'do', 'else', 'in', 'of', 'new', 'delete', 'void', 'throw',
+    '=>', '==', '===', '!=', '!==', '&&', '||', '??', '+=', '-='
+}
+
+# Objects that only qualify a global (window.location is location)
+GLOBAL_PREFIXES = ('window.', 'self.', 'top.', 'parent.', 'globalThis.', 'document.location')
+GLOBAL_HEADS = {prefix.split('.')[0] for prefix in GLOBAL_PREFIXES}
+
+# Member names kept per chain; longer chains are consumed but truncated
+MAX_CHAIN = 16
+
+# Members of sources that an attacker cannot choose (scheme, host, port...)
+UNCONTROLLED = {
+    'location.protocol', 'location.origin', 'location.host', 'location.hostname', 'location.port',
+    'document.domain', 'document.readyState', 'document.characterSet', 'document.contentType',
+    'document.lastModified'
+}
+
+# A value next to these operators only decides a branch or a boolean
+CONDITION_BEFORE = {'==', '===', '!=', '!==', '<', '>', '<=', '>=', '!', 'typeof', 'instanceof', 'in'}
+CONDITION_AFTER = {'==', '===', '!=', '!==', '<', '>', '<=', '>=', '?', 'instanceof', 'in'}
+
+# Calls whose result is safe to insert whatever their arguments are
+SANITIZERS = {
+    'encodeURIComponent', 'encodeURI', 'escape', 'parseInt', 'parseFloat', 'Number',
+    'DOMPurify.sanitize', 'Math.floor', 'Math.round', 'Boolean'
+}
+
+# Sinks written by assignment; matched on the last property for element properties
+PROPERTY_SINKS = {'innerHTML', 'outerHTML', 'srcdoc'}
+ASSIGNMENT_SINKS = {'location', 'location.href'}
+
+# Sinks that run their argument as code
+CODE_SINKS = {'eval', 'setTimeout', 'setInterval', 'execScript', 'Function'}
+
+
+class Token:
+    __slots__ = ('kind', 'value', 'line')
+
+    def __init__(self, kind, value, line):
+        self.kind = kind
+        self.value = value
+        self.line = line
+
+    def __repr__(self):
+        return "<Token %s %r>" % (self.kind, self.value)
+
+
+class BudgetExceeded(Exception):
+    """Raised internally when a script runs out of its time or step budget"""
+
+
+def tokenize(code, deadline=None):
+    """
+    Split JavaScript into tokens
+
+    Comments are dropped, newlines are kept (as 'nl' tokens) for automatic
+    semicolon insertion. Template literal interpolations are spliced in as
+    `+ ( expression )` so their contents take part in the dataflow.
+
+    Args:
+        code (str): Script source
+        deadline (float): time.monotonic() value after which to give up
+
+    Returns:
+        list: Token objects
+
+    Raises:
+        BudgetExceeded: If the deadline passes
+    """
+    tokens = []
+    i = 0
+    n = len(code)
+    line = 1
+    steps = 0
+
+    def previous():
+        for token in reversed(tokens):
+            if token.kind != 'nl':
+                return token
+        return None
+
+    while i < n:
+        steps += 1
+        if deadline is not None and not steps & 1023 and time.monotonic() > deadline:
+            raise BudgetExceeded()
+
+        c = code[i]
+        if c == '\n':
+            tokens.append(Token('nl', '\n', line))
+            line += 1
+            i += 1
+        elif c.isspace():
+            i += 1
+        elif code.startswith('//', i):
+            end = code.find('\n', i)
+            i = n if end < 0 else end
+        elif code.startswith('/*', i):
+            end = code.find('*/', i + 2)
+            end = n if end < 0 else end + 2
+            line += code.count('\n', i, end)
+            i = end
+        elif c.isalpha() or c in '_$':
+            j = i + 1
+            while j < n and (code[j].isalnum() or code[j] in '_$'):
+                j += 1
+            tokens.append(Token('name', code[i:j], line))
+            i = j
+        elif c.isdigit():
+            j = i + 1
+            while j < n and (code[j].isalnum() or code[j] == '.'):
+                j += 1
+            tokens.append(Token('num', code[i:j], line))
+            i = j
+        elif c in '"\'':
+            j = i + 1
+            while j < n and code[j] != c and code[j] != '\n':
+                j += 2 if code[j] == '\\' else 1
+            tokens.append(Token('str', code[i + 1:j], line))
+            i = j + 1
+        elif c == '`':
+            i, line = _template(code, i, line, tokens, deadline)
+        elif c == '/' and _regex_allowed(previous()):
+            j = i + 1
+            in_class = False
+            while j < n and code[j] != '\n' and (in_class or code[j] != '/'):
+                if code[j] == '\\':
+                    j += 1
+                elif code[j] == '[':
+                    in_class = True
+                elif code[j] == ']':
+                    in_class = False
+                j += 1
+            j += 1
+            while j < n and code[j].isalpha():
+                j += 1
+            tokens.append(Token('regex', code[i:j], line))
+            i = j
+        else:
+            for punct in PUNCTUATORS_BY_CHAR.get(c, ()):
+                if code.startswith(punct, i):
+                    break
+            else:
+                punct = c
+            tokens.append(Token('punct', punct, line))
+            i += len(punct)
+
+    return tokens
+
+
+def _regex_allowed(token):
+    return token is None or token.value in REGEX_PREFIX
+
+
+def _template(code, i, line, tokens, deadline):
+    """Tokenize a template literal starting at code[i] == '`'"""
+    n = len(code)
+    j = i + 1
+    start = j
+    while j < n and code[j] != '`':
+        if code[j] == '\\':
+            j += 2
+            continue
+        if code.startswith('${', j):
+            tokens.append(Token('str', code[start:j], line))
+            depth = 1
+            k = j + 2
+            while k < n and depth:
+                if code[k] == '{':
+                    depth += 1
+                elif code[k] == '}':
+                    depth -= 1
+                k += 1
+            tokens.append(Token('punct', '+', line))
+            tokens.append(Token('punct', '(', line))
+            tokens.extend(token for token in tokenize(code[j + 2:k - 1], deadline) if token.kind != 'nl')
+            tokens.append(Token('punct', ')', line))
+            tokens.append(Token('punct', '+', line))
+            line += code.count('\n', j, k)
+            j = start = k
+            continue
+        if code[j] == '\n':
+            line += 1
+        j += 1
+    tokens.append(Token('str', code[start:j], line))
+    return j + 1, line
+
+
+class TaintResult:
+    """
+    Outcome of analysing one script
+
+    Attributes:
+        flows (list): Dicts with 'source', 'sink', 'path' (list) and 'line'
+        complete (bool): False if the size or time budget cut the analysis short
+    """
+
+    def __init__(self, flows, complete=True):
+        self.flows = flows
+        self.complete = complete
+
+    def __repr__(self):
+        return "<TaintResult flows=%d complete=%s>" % (len(self.flows), self.complete)
+
+
+class TaintAnalyzer:
+    """
+    Intra-script source-to-sink dataflow analysis
+
+    Args:
+        sources (list): DOM sources, e.g. DOMXSSDetector.dom_sources
+        sinks (list): DOM sinks, e.g. DOMXSSDetector.dom_sinks
+        max_bytes (int): Scripts are truncated to this many characters
+        max_steps (int): Tokens inspected per script before the analysis stops (deterministic)
+        max_expression (int): Tokens inspected per right-hand side or argument list
+        max_path (int): Names kept in a reported flow path
+
+    Example:
+        >>> analyzer = TaintAnalyzer(detector.dom_sources, detector.dom_sinks)
+        >>> analyzer.analyze("var h = location.hash; el.innerHTML = h;").flows[0]['path']
+        ['location.hash', 'h', 'innerHTML']
+    """
+
+    # Shared by all analyzers; keyed by script hash and configuration
+    _cache = OrderedDict()
+    _cache_lock = threading.Lock()
+    cache_size = 2048
+
+    def __init__(self, sources, sinks, max_bytes=256 * 1024, max_steps=2000000, max_expression=256,
+                 max_path=12):
+        self.sources = sorted(set(sources), key=len, reverse=True)
+        self._source_set = set(self.sources)
+        self.sinks = set(sinks)
+        self.max_bytes = max_bytes
+        self.max_steps = max_steps
+        self.max_expression = max_expression
+        self.max_path = max_path
+        self._config = hashlib.sha1(repr((self.sources, sorted(self.sinks), max_bytes, max_steps,
+                                          max_expression)).encode()).hexdigest()
+
+    def analyze(self, code):
+        """
+        Analyse one script, reusing the cached result for identical scripts
+
+        Args:
+            code (str): Script source
+
+        Returns:
+            TaintResult: Flows found
+        """
+        key = (self._config, hashlib.sha1(code.encode("utf-8", "surrogatepass")).hexdigest())
+        with self._cache_lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+
+        result = self._analyze(code)
+
+        with self._cache_lock:
+            self._cache[key] = result
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return result
+
+    def _analyze(self, code):
+        """
+        The budget is counted in tokens inspected, not in seconds, so a
+        script gets the same result on every run and every machine and the
+        result can be cached even when it is incomplete.
+        """
+        complete = len(code) <= self.max_bytes
+        tokens = tokenize(code[:self.max_bytes])
+        assignments, sink_sites = self._collect(tokens)
+        steps = [self.max_steps]
+
+        flows = []
+        try:
+            # Two rounds let a flow through a function defined before its
+            # source assignment be found; still linear in the script size.
+            # tainted maps a name to the origin of its value: ('source', s)
+            # or ('var', name), so paths are rebuilt only when reported.
+            tainted = {}
+            for _ in range(2):
+                for lhs, start, end in assignments:
+                    if lhs not in tainted:
+                        origin = self._taint(tokens, start, end, tainted, steps)
+                        if origin:
+                            tainted[lhs] = origin
+
+            seen = set()
+            memo = {}
+            for sink, start, end, line in sink_sites:
+                origin = self._taint(tokens, start, end, tainted, steps)
+                if not origin:
+                    continue
+                path = self._path(origin, tainted, memo)
+                if (sink, tuple(path)) not in seen:
+                    seen.add((sink, tuple(path)))
+                    flows.append({'source': path[0], 'sink': sink, 'path': path + [sink], 'line': line})
+        except BudgetExceeded:
+            complete = False
+        return TaintResult(flows, complete)
+
+    def _path(self, origin, tainted, memo):
+        """
+        Rebuild the flow path of an origin, keeping at most max_path names
+
+        Paths are memoised per name so reporting stays linear even for long
+        assignment chains shared by many sinks.
+        """
+        names = []
+        while origin[0] == 'var' and origin[1] not in memo:
+            names.append(origin[1])
+            origin = tainted[origin[1]]
+
+        path = memo[origin[1]] if origin[0] == 'var' else [origin[1]]
+        for name in reversed(names):
+            path = path + [name]
+            if len(path) > self.max_path + 1:
+                path = [path[0], '...'] + path[-(self.max_path - 1):]
+            memo[name] = path
+        return path
+
+    def _collect(self, tokens):
+        """Find assignments and sink sites with the token ranges of their values"""
+        assignments = []
+        sink_sites = []
+        n = len(tokens)
+        k = 0
+        while k < n:
+            token = tokens[k]
+            if token.kind != 'name':
+                k += 1
+                continue
+
+            if k and tokens[k - 1].value in ('.', '?.'):
+                # Only property writes on a call or index result start a chain here,
+                # as in document.getElementById('x').innerHTML = ...
+                if k < 2 or tokens[k - 2].value not in (')', ']'):
+                    k += 1
+                    continue
+
+            chain, after, _ = self._chain(tokens, k, n)
+            following = tokens[after].value if after < n else None
+
+            if following in ASSIGNMENT_OPERATORS:
+                end = self._expression_end(tokens, after + 1)
+                sink = self._assignment_sink(chain)
+                if sink:
+                    sink_sites.append((sink, after + 1, end, token.line))
+                else:
+                    assignments.append((chain, after + 1, end))
+
+            elif following == '(':
+                sink = self._call_sink(chain)
+                if sink:
+                    end = self._matching(tokens, after)
+                    if not (sink in ('setTimeout', 'setInterval') and self._is_function(tokens, after + 1)):
+                        sink_sites.append((sink, after + 1, end, token.line))
+
+            k = after if after > k else k + 1
+        return assignments, sink_sites
+
+    def _chain(self, tokens, k, end, tainted=None):
+        """
+        Read a member chain a.b.c (or a['b']) in tokens[k:end]
+
+        Only the first MAX_CHAIN names are kept, so the prefix lookup in
+        `tainted` costs a bounded number of steps per chain.
+
+        Returns:
+            tuple: (normalized chain, index after it, longest prefix of the
+            chain found in `tainted` or None)
+        """
+        parts = [tokens[k].value]
+        k += 1
+        while k + 1 < end:
+            if tokens[k].kind == 'nl' and tokens[k + 1].value in ('.', '?.'):
+                k += 1
+                continue
+            if tokens[k].value in ('.', '?.') and tokens[k + 1].kind == 'name':
+                part = tokens[k + 1].value
+                k += 2
+            elif (tokens[k].value == '[' and tokens[k + 1].kind == 'str'
+                  and k + 2 < end and tokens[k + 2].value == ']'):
+                part = tokens[k + 1].value
+                k += 3
+            else:
+                break
+            if len(parts) < MAX_CHAIN:
+                parts.append(part)
+
+        found = None
+        if tainted:
+            prefix = None
+            for part in parts:
+                prefix = part if prefix is None else prefix + '.' + part
+                name = self._normalize(prefix)
+                if name in tainted:
+                    found = name
+        return self._normalize(".".join(parts)), k, found
+
+    @staticmethod
+    def _normalize(chain):
+        if chain.split('.', 1)[0] not in GLOBAL_HEADS:
+            return chain
+        for prefix in GLOBAL_PREFIXES:
+            if chain.startswith(prefix):
+                return chain[len(prefix):] if prefix.endswith('.') else 'location' + chain[len(prefix):]
+        return chain
+
+    def _assignment_sink(self, chain):
+        last = chain.rsplit('.', 1)[-1]
+        if last in PROPERTY_SINKS and last in self.sinks:
+            return last
+        if chain in ASSIGNMENT_SINKS and chain in self.sinks:
+            return chain
+        if 'onevent' in self.sinks and '.' in chain and re.match(r'^on[a-z]+$', last):
+            return last
+        return None
+
+    def _call_sink(self, chain):
+        for sink in self.sinks:
+            if sink in PROPERTY_SINKS or sink in ASSIGNMENT_SINKS or sink == 'onevent':
+                continue
+            if chain == sink or chain.endswith('.' + sink):
+                return sink
+        if chain == 'Function' or chain.endswith('.Function'):
+            return 'Function'
+        return None
+
+    def _expression_end(self, tokens, start):
+        """End (exclusive) of the expression starting at tokens[start]"""
+        depth = 0
+        n = len(tokens)
+        k = start
+        limit = min(n, start + self.max_expression)
+        while k < limit:
+            value = tokens[k].value
+            if value in ('(', '[', '{'):
+                depth += 1
+            elif value in (')', ']', '}'):
+                depth -= 1
+                if depth < 0:
+                    break
+            elif depth == 0:
+                if value in (';', ','):
+                    break
+                if tokens[k].kind == 'nl' and not self._continues(tokens, k):
+                    break
+            k += 1
+        return k
+
+    @staticmethod
+    def _continues(tokens, k):
+        """Automatic semicolon insertion: does the statement go on after a newline?"""
+        before = tokens[k - 1] if k else None
+        after = tokens[k + 1] if k + 1 < len(tokens) else None
+        if before is not None and before.kind == 'punct' and before.value not in (')', ']', '}', '++', '--'):
+            return True
+        return after is not None and after.kind == 'punct' and after.value in ('.', '?.', '+', '?', ':', '&&', '||')
+
+    def _matching(self, tokens, open_index):
+        depth = 0
+        limit = min(len(tokens), open_index + self.max_expression)
+        for k in range(open_index, limit):
+            if tokens[k].value in ('(', '[', '{'):
+                depth += 1
+            elif tokens[k].value in (')', ']', '}'):
+                depth -= 1
+                if depth == 0:
+                    return k
+        return limit
+
+    @staticmethod
+    def _is_function(tokens, k):
+        while k < len(tokens) and tokens[k].kind == 'nl':
+            k += 1
+        if k >= len(tokens):
+            return False
+        if tokens[k].value == 'function':
+            return True
+        # Arrow function: x => ... or (a, b) => ...
+        for j in range(k, min(len(tokens), k + 16)):
+            if tokens[j].value == '=>':
+                return True
+            if tokens[j].value in (',', ';'):
+                return False
+        return False
+
+    @staticmethod
+    def _condition(tokens, start, k, after, end):
+        """Is the chain at tokens[k:after] only compared or used as a ternary condition?"""
+        if k > start and tokens[k - 1].value in CONDITION_BEFORE:
+            return True
+        return after < end and tokens[after].value in CONDITION_AFTER
+
+    def _source(self, chain):
+        """Longest source the chain reads from, None for uncontrolled members"""
+        found = None
+        prefix = None
+        for part in chain.split('.'):
+            prefix = part if prefix is None else prefix + '.' + part
+            if prefix in UNCONTROLLED:
+                return None
+            if prefix in self._source_set:
+                found = prefix
+        return found
+
+    def _taint(self, tokens, start, end, tainted, steps=None):
+        """
+        Origin of the first tainted value read in tokens[start:end]
+
+        Args:
+            steps (list): One-item list holding the tokens the analysis may
+                still inspect, shared by all calls for a script
+
+        Raises:
+            BudgetExceeded: If the step budget runs out
+
+        Returns:
+            tuple: ('source', source) or ('var', tainted name), None if clean
+        """
+        if steps is not None:
+            # Each iteration advances k, so this bounds the loop below
+            steps[0] -= end - start
+            if steps[0] < 0:
+                raise BudgetExceeded()
+
+        k = start
+        while k < end:
+            token = tokens[k]
+            if token.value in ('function', '=>'):
+                # A function value is code, not data
+                return None
+            if token.kind != 'name' or (k > start and tokens[k - 1].value in ('.', '?.')):
+                k += 1
+                continue
+
+            chain, after, found = self._chain(tokens, k, end, tainted)
+            if chain in SANITIZERS and after < end and tokens[after].value == '(':
+                k = self._matching(tokens, after) + 1
+                continue
+
+            if self._condition(tokens, start, k, after, end) or chain.endswith('.length'):
+                # Only the length or a comparison of the value gets through
+                k = max(after, k + 1)
+                continue
+
+            source = self._source(chain)
+            if source:
+                return ('source', source)
+
+            if found:
+                return ('var', found)
+
+            k = max(after, k + 1)
+        return None
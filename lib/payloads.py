@@ -0,0 +1,324 @@
+"""
+Payload Library Module for XSSProbe
+Loads the payload corpus, generates encoding variants and ranks payloads
+
+Payloads live in a plain text corpus grouped by reflection context. Each
+payload is tagged with the characters and keywords it needs, so it can be
+matched against a FilterProfile from the filter probe. Variants (mixed
+case, slash separators, backtick calls...) are only generated when the
+corpus itself runs out. Per-context success statistics are persisted
+between scans and used to try historically effective payloads first.
+"""
+
+import json
+import os
+import re
+import tempfile
+import threading
+from contextlib import contextmanager
+from itertools import combinations
+try:
+    import fcntl
+except ImportError:
+    # Windows: saves are still atomic, concurrent processes may lose counts
+    fcntl = None
+from lib.probe import FilterProbe
+
+CORPUS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "payloads.txt")
+STATS_PATH = os.path.join(os.path.expanduser("~"), ".xssprobe", "stats.json")
+
+
+class Payload:
+    """
+    A single corpus entry
+
+    Attributes:
+        text (str): Payload as sent
+        context (str): Reflection context it targets (html, attribute, script, dom)
+        required (set): Probe tokens needed for it to be reflected intact
+    """
+
+    def __init__(self, text, context):
+        self.text = text
+        self.context = context
+        self.required = FilterProbe.required_tokens(text)
+
+    def __repr__(self):
+        return "<Payload %s %r>" % (self.context, self.text)
+
+
+def _mixed_case(text):
+    return re.sub(r'(?<=<)(/?)([a-zA-Z]+)|javascript',
+                  lambda m: "".join(c.upper() if i % 2 else c.lower() for i, c in enumerate(m.group(0))),
+                  text)
+
+
+def _slash_separator(text):
+    return re.sub(r'<([a-zA-Z]+) ', r'<\1/', text)
+
+
+def _backtick_call(text):
+    return re.sub(r'\b(alert|prompt|confirm)\(([\w\'"/]*)\)', lambda m: m.group(1) + "`" + m.group(2).strip("'\"") + "`", text)
+
+
+def _swap_quotes(text):
+    return text.translate(str.maketrans({'"': "'", "'": '"'}))
+
+
+def _entity_parens(text):
+    return text.replace("(", "&#40;").replace(")", "&#41;")
+
+
+class PayloadLibrary:
+    """
+    Corpus of payloads with adaptive ordering
+
+    Example:
+        >>> library = PayloadLibrary.default()
+        >>> for payload in library.candidates("html", profile, limit=5):
+        ...     send(payload)
+    """
+
+    # Applied alone, then in pairs, to build variants lazily
+    TRANSFORMS = [_mixed_case, _slash_separator, _backtick_call, _swap_quotes, _entity_parens]
+
+    _default = None
+    _default_lock = threading.Lock()
+
+    def __init__(self, corpus_path=CORPUS_PATH, stats_path=STATS_PATH):
+        self.corpus_path = corpus_path
+        self.stats_path = stats_path
+        self.corpus = self.load_corpus(corpus_path)
+        self.stats = self.load_stats(stats_path)
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def default(cls):
+        """
+        Shared library built from the bundled corpus
+
+        Returns:
+            PayloadLibrary: Process-wide instance, loaded on first use
+        """
+        with cls._default_lock:
+            if cls._default is None:
+                cls._default = cls()
+            return cls._default
+
+    @staticmethod
+    def load_corpus(path):
+        """
+        Parse a corpus file
+
+        Args:
+            path (str): Corpus file path
+
+        Returns:
+            dict: Context name to list of deduplicated Payload objects
+        """
+        corpus = {}
+        seen = set()
+        context = "html"
+
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                line = line.rstrip("\r\n")
+                # "#" alone or followed by a space is a comment, "#<..." is a DOM payload
+                if not line.strip() or re.match(r'^\s*#(\s|$)', line):
+                    continue
+
+                section = re.match(r'^\[(\w+)\]$', line.strip())
+                if section:
+                    context = section.group(1).lower()
+                    continue
+
+                if (context, line) in seen:
+                    continue
+                seen.add((context, line))
+                corpus.setdefault(context, []).append(Payload(line, context))
+
+        return corpus
+
+    @staticmethod
+    def load_stats(path):
+        """
+        Load persisted success statistics
+
+        Args:
+            path (str): Stats file path
+
+        Returns:
+            dict: Context to {payload: [attempts, successes]}
+        """
+        if not path or not os.path.exists(path):
+            return {}
+        try:
+            with open(path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def score(self, text, context):
+        """
+        Smoothed success rate of a payload in a context
+
+        Untried payloads score 0.5, so one that keeps failing sinks below
+        fresh ones while one that worked before rises to the top.
+        """
+        attempts, successes = self.stats.get(context, {}).get(text, (0, 0))
+        return (successes + 1.0) / (attempts + 2.0)
+
+    def texts(self, context):
+        """
+        Corpus payloads for a context in ranked order
+
+        Args:
+            context (str): Reflection context
+
+        Returns:
+            list: Payload strings
+        """
+        return [payload.text for payload in self._ranked(context)]
+
+    def _ranked(self, context):
+        entries = list(self.corpus.get(context, []))
+        known = {payload.text for payload in entries}
+
+        with self._lock:
+            # Variants that confirmed a finding in an earlier scan join the base set
+            for text, (attempts, successes) in self.stats.get(context, {}).items():
+                if successes and text not in known:
+                    entries.append(Payload(text, context))
+
+            return sorted(entries, key=lambda payload: -self.score(payload.text, context))
+
+    def variants(self, text):
+        """
+        Lazily generate encoding variants of a payload
+
+        Args:
+            text (str): Base payload
+
+        Yields:
+            str: Distinct variants, single transforms first
+        """
+        seen = {text}
+        for size in (1, 2):
+            for chain in combinations(self.TRANSFORMS, size):
+                variant = text
+                for transform in chain:
+                    variant = transform(variant)
+                if variant not in seen:
+                    seen.add(variant)
+                    yield variant
+
+    def candidates(self, context, profile=None, limit=None, variants=True):
+        """
+        Payloads worth sending to one injection point, best first
+
+        Args:
+            context (str): Reflection context (html, attribute, script, dom)
+            profile (FilterProfile): Probe result, None to skip filtering
+            limit (int): Maximum number of payloads to yield
+            variants (bool): Fall back to generated variants after the corpus
+
+        Yields:
+            str: Payload strings
+        """
+        ranked = self._ranked(context)
+        if not ranked and context != "html":
+            ranked = self._ranked("html")
+
+        def generate():
+            for payload in ranked:
+                yield payload.text
+            if variants:
+                for payload in ranked:
+                    yield from self.variants(payload.text)
+
+        seen = set()
+        count = 0
+        for text in generate():
+            if limit is not None and count >= limit:
+                return
+            if text in seen or (profile is not None and not profile.allows(text)):
+                continue
+            seen.add(text)
+            count += 1
+            yield text
+
+    def record(self, text, context, success):
+        """
+        Record the outcome of sending a payload
+
+        Args:
+            text (str): Payload sent
+            context (str): Context it was sent to
+            success (bool): True if the payload was confirmed reflected
+        """
+        with self._lock:
+            for table in (self.stats, self._pending):
+                counts = table.setdefault(context, {}).setdefault(text, [0, 0])
+                counts[0] += 1
+                counts[1] += 1 if success else 0
+
+    def save(self):
+        """
+        Merge recorded outcomes into the stats file
+
+        The merge runs under an exclusive lock on a side file and the
+        result is written to a private temporary file that atomically
+        replaces the stats file, so concurrent scans (or crawler
+        subprocesses) add to each other's counts instead of overwriting
+        them. Outcomes that could not be written are kept for the next save.
+        """
+        if not self.stats_path:
+            return
+
+        with self._lock:
+            if not self._pending:
+                return
+            pending, self._pending = self._pending, {}
+
+            try:
+                directory = os.path.dirname(self.stats_path)
+                os.makedirs(directory, exist_ok=True)
+                with self._file_lock():
+                    merged = self.load_stats(self.stats_path)
+                    self._merge(merged, pending)
+
+                    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".stats-", suffix=".tmp")
+                    try:
+                        with os.fdopen(fd, "w", encoding="utf-8") as f:
+                            json.dump(merged, f)
+                        os.replace(tmp_path, self.stats_path)
+                    except BaseException:
+                        os.unlink(tmp_path)
+                        raise
+            except OSError:
+                self._merge(self._pending, pending)
+                return
+
+            self.stats = merged
+
+    @staticmethod
+    def _merge(target, counts):
+        for context, table in counts.items():
+            for text, (attempts, successes) in table.items():
+                entry = target.setdefault(context, {}).setdefault(text, [0, 0])
+                entry[0] += attempts
+                entry[1] += successes
+
+    @contextmanager
+    def _file_lock(self):
+        """Hold an exclusive lock on <stats_path>.lock across processes"""
+        if fcntl is None:
+            yield
+            return
+        with open(self.stats_path + ".lock", "a") as lock_file:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
@@ -0,0 +1,302 @@
+"""
+Filter Fingerprinting Module for XSSProbe
+Learns which characters and tokens an injection point lets through
+
+Before any payload is sent to a parameter, a single probe request carries
+every interesting character and keyword wrapped in unique markers. The
+reflected copy tells us exactly what the application strips or encodes,
+so payloads that can never be reflected intact are not sent at all.
+
+A WAF may reject the combined probe outright. The endpoint is then probed
+again with plain markers and with the tokens split into smaller groups,
+within a small request allowance; parameters that cannot be decided get an
+unknown profile, which lets every payload through.
+"""
+
+import re
+from random import choice
+from string import ascii_lowercase
+from urllib.parse import urlparse
+from lib.helper.Log import Log
+
+
+class FilterProfile:
+    """
+    What survived the probe for one parameter
+
+    Attributes:
+        reflected (bool): True if the probe marker came back in the response
+        survived (set): Tokens reflected without modification
+        context (str): Where the marker was reflected (html, attribute, script)
+        known (bool): False if the probes were blocked and nothing was learned
+    """
+
+    def __init__(self, reflected, survived=(), context="html", known=True):
+        self.reflected = reflected
+        self.survived = set(survived)
+        self.context = context
+        self.known = known
+
+    @classmethod
+    def unknown(cls):
+        """
+        Returns:
+            FilterProfile: Profile allowing every payload, for undecided parameters
+        """
+        return cls(True, FilterProbe.TOKENS, known=False)
+
+    def allows(self, payload):
+        """
+        Check whether a payload can be reflected intact
+
+        Args:
+            payload (str): Payload to check
+
+        Returns:
+            bool: True if every token the payload needs survived the probe
+        """
+        if not self.reflected:
+            return False
+        return FilterProbe.required_tokens(payload) <= self.survived
+
+    def __repr__(self):
+        if not self.known:
+            return "<FilterProfile unknown>"
+        if not self.reflected:
+            return "<FilterProfile not reflected>"
+        return "<FilterProfile %s survived=%r>" % (self.context, sorted(self.survived))
+
+
+class FilterProbe:
+    """
+    Character-set probe with a per-endpoint cache
+
+    One request is sent per endpoint signature, probing all of its
+    parameters at once with a distinct marker each. Profiles are cached
+    so links and forms sharing a signature are only probed once.
+    """
+
+    # Single characters a payload may depend on
+    CHARS = ['<', '>', '"', "'", '/', '\\', '(', ')', '=', ';', '`', ' ']
+
+    # Keywords filters commonly strip or mangle
+    WORDS = ['script', 'javascript', 'onerror', 'onload', 'alert', 'prompt', 'svg', 'img']
+
+    TOKENS = CHARS + WORDS
+
+    # Extra requests an endpoint may cost when its probe is rejected
+    reprobe_requests = 10
+
+    def __init__(self):
+        self.cache = {}
+
+    @staticmethod
+    def signature(method, url, params):
+        """
+        Build the cache key for an endpoint
+
+        Args:
+            method (str): HTTP method
+            url (str): Endpoint URL (query string is ignored)
+            params (iterable): Parameter names
+
+        Returns:
+            tuple: Hashable endpoint signature
+        """
+        parsed = urlparse(url)
+        return (method.upper(), parsed.scheme, parsed.netloc, parsed.path, tuple(sorted(params)))
+
+    @classmethod
+    def required_tokens(cls, payload):
+        """
+        Tokens a payload needs in order to be reflected intact
+
+        Args:
+            payload (str): Payload to inspect
+
+        Returns:
+            set: Subset of TOKENS present in the payload
+
+        Keywords are matched case-sensitively, so a mixed-case variant
+        such as <ScRiPt> stays viable when only lowercase 'script' is
+        stripped.
+        """
+        return {token for token in cls.TOKENS if token in payload}
+
+    @classmethod
+    def build(cls, marker, indices=None):
+        """
+        Build the probe string for one parameter
+
+        Args:
+            marker (str): Unique alphabetic marker
+            indices (list): Positions in TOKENS to probe, all tokens if None
+
+        Returns:
+            str: Probe value
+        """
+        if indices is None:
+            indices = range(len(cls.TOKENS))
+        probe = "".join(marker + str(index) + cls.TOKENS[index] for index in indices)
+        return probe + marker
+
+    @classmethod
+    def parse(cls, marker, text):
+        """
+        Read back which tokens survived from a response body
+
+        Args:
+            marker (str): Marker used when building the probe
+            text (str): Response body
+
+        Returns:
+            FilterProfile: Profile for the probed parameter
+        """
+        if marker not in text:
+            return FilterProfile(False)
+
+        survived = set()
+        pattern = re.escape(marker) + r'(\d+)(.*?)(?=' + re.escape(marker) + ')'
+        for match in re.finditer(pattern, text, re.DOTALL):
+            index = int(match.group(1))
+            if index < len(cls.TOKENS) and match.group(2) == cls.TOKENS[index]:
+                survived.add(cls.TOKENS[index])
+
+        return FilterProfile(True, survived, cls.context_at(text, text.index(marker)))
+
+    @staticmethod
+    def context_at(text, position):
+        """
+        Classify where in the document a reflection sits
+
+        Args:
+            text (str): Response body
+            position (int): Offset of the reflection
+
+        Returns:
+            str: 'script', 'attribute' or 'html'
+        """
+        before = text[:position].lower()
+        if before.rfind("<script") > before.rfind("</script"):
+            return "script"
+        if before.rfind("<") > before.rfind(">"):
+            return "attribute"
+        return "html"
+
+    @staticmethod
+    def _marker():
+        return "xsp" + "".join(choice(ascii_lowercase) for _ in range(6))
+
+    def fingerprint(self, session_obj, method, url, params, fixed=None):
+        """
+        Probe every parameter of an endpoint with a single request
+
+        Args:
+            session_obj: Requests session object
+            method (str): GET or POST
+            url (str): Endpoint URL without injected values
+            params (iterable): Parameter names to probe
+            fixed (dict): Extra fields sent unchanged (e.g. submit buttons)
+
+        Returns:
+            dict: Parameter name to FilterProfile, empty if the probe failed
+        """
+        params = list(params)
+        key = self.signature(method, url, params)
+        if key in self.cache:
+            return self.cache[key]
+
+        markers = {name: self._marker() for name in params}
+        data = dict(fixed or {})
+        data.update({name: self.build(marker) for name, marker in markers.items()})
+
+        try:
+            response = self._send(session_obj, method, url, data)
+            if response.status_code >= 400:
+                # Rejected outright, most likely by a WAF: find out what it objects to
+                profiles = self._reprobe(session_obj, method, url, markers, fixed)
+            else:
+                profiles = {name: self.parse(marker, response.text) for name, marker in markers.items()}
+        except Exception as e:
+            Log.info("Filter probe failed: " + str(e))
+            return {}
+
+        self.cache[key] = profiles
+        return profiles
+
+    @staticmethod
+    def _send(session_obj, method, url, data):
+        if method.upper() == "POST":
+            return session_obj.post(url, data=data, verify=False)
+        return session_obj.get(url, params=data, verify=False)
+
+    def _reprobe(self, session_obj, method, url, markers, fixed):
+        """
+        Probe an endpoint whose combined probe was rejected
+
+        A plain marker per parameter tells which parameters reflect at
+        all; the tokens are then sent in groups, halved whenever a group is
+        rejected. A WAF judges the request, not the parameter, so every
+        group is sent to all parameters at once. At most `reprobe_requests`
+        requests are spent; parameters still undecided then get an unknown
+        profile.
+
+        Returns:
+            dict: Parameter name to FilterProfile
+        """
+        allowance = self.reprobe_requests
+
+        def send(indices):
+            nonlocal allowance
+            allowance -= 1
+            data = dict(fixed or {})
+            data.update({name: marker if indices is None else self.build(marker, indices)
+                         for name, marker in markers.items()})
+            return self._send(session_obj, method, url, data)
+
+        response = send(None)
+        if response.status_code >= 400:
+            Log.info("Filter probe rejected (" + str(response.status_code) + "), not filtering payloads")
+            return {name: FilterProfile.unknown() for name in markers}
+
+        text = response.text
+        reflecting = {name: marker for name, marker in markers.items() if marker in text}
+        profiles = {name: FilterProfile(False) for name in markers if name not in reflecting}
+        contexts = {name: self.context_at(text, text.index(marker)) for name, marker in reflecting.items()}
+        survived = {name: set() for name in reflecting}
+
+        groups = [list(range(len(self.CHARS))), list(range(len(self.CHARS), len(self.TOKENS)))]
+        while groups and reflecting:
+            if allowance <= 0:
+                Log.info("Filter probe undecided, not filtering payloads")
+                profiles.update({name: FilterProfile.unknown() for name in reflecting})
+                return profiles
+
+            indices = groups.pop()
+            response = send(indices)
+            if response.status_code < 400:
+                for name, marker in reflecting.items():
+                    survived[name] |= self.parse(marker, response.text).survived
+            elif len(indices) > 1:
+                half = len(indices) // 2
+                groups += [indices[:half], indices[half:]]
+
+        profiles.update({name: FilterProfile(True, survived[name], contexts[name]) for name in reflecting})
+        return profiles
+
+    @staticmethod
+    def allows_any(profiles, payload):
+        """
+        Check whether at least one probed parameter accepts a payload
+
+        Args:
+            profiles (dict): Result of fingerprint()
+            payload (str): Payload to check
+
+        Returns:
+            bool: True if the payload is worth sending. An empty profile
+            map (probe failed) never blocks a payload.
+        """
+        if not profiles:
+            return True
+        return any(profile.allows(payload) for profile in profiles.values())
@@ -0,0 +1,352 @@
+"""
+Archive Replay Module for XSSProbe
+Serves scan traffic from a recorded HAR or WARC archive instead of the network
+
+ReplayAdapter is a requests transport adapter: mounted on the scan session
+(see Scanner and helper.session) it answers every request the crawler,
+core and DOMXSSDetector make from an indexed archive. Scans then run at
+CPU speed, never touch the target and give identical inputs to every
+scanner version, which makes them usable for profiling and regression
+benchmarks.
+
+Probe and payload requests are usually not in the archive. With
+`synthesize` enabled they are answered from a simple reflection model: a
+recorded response of the same endpoint is taken and every parameter value
+that was reflected in it is replaced by the new value, i.e. the endpoint
+is assumed to reflect its parameters verbatim, without any filtering.
+Replay scans should therefore use a PayloadLibrary without a stats file,
+which also keeps the payload order identical from one replay to the next.
+"""
+
+import base64
+import gzip
+import json
+import threading
+import zlib
+from urllib.parse import urlsplit, parse_qsl, urlencode
+from requests.adapters import BaseAdapter
+from requests.models import Response
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+# Headers describing the transfer, not the (already decoded) body
+HOP_HEADERS = {'content-encoding', 'transfer-encoding', 'content-length'}
+
+
+class Recording:
+    """
+    One archived exchange
+
+    Attributes:
+        method (str): Request method
+        url (str): Request URL
+        data: Request body (str or bytes), None for bodiless requests
+        params (list): (name, value) pairs from the query string and form body
+        status (int): Response status code
+        reason (str): Response reason phrase
+        headers (list): Response (name, value) pairs
+        body (bytes): Decoded response body
+    """
+
+    def __init__(self, method, url, body, status, reason, headers, content):
+        self.method = method.upper()
+        self.url = url
+        self.data = body
+        self.params = parse_qsl(urlsplit(url).query, keep_blank_values=True) + _form_params(body)
+        self.status = status
+        self.reason = reason
+        self.headers = [(name, value) for name, value in headers if name.lower() not in HOP_HEADERS]
+        self.body = content
+
+
+def _form_params(body):
+    if not body:
+        return []
+    if isinstance(body, bytes):
+        body = body.decode("utf-8", "replace")
+    if "=" not in body:
+        return []
+    return parse_qsl(body, keep_blank_values=True)
+
+
+def _endpoint(method, url):
+    parts = urlsplit(url)
+    return (method.upper(), parts.scheme.lower(), parts.netloc.lower(), parts.path or "/")
+
+
+def _key(method, url, body):
+    params = parse_qsl(urlsplit(url).query, keep_blank_values=True) + _form_params(body)
+    if body and not params:
+        return _endpoint(method, url) + (body if isinstance(body, bytes) else body.encode(),)
+    return _endpoint(method, url) + (urlencode(sorted(params)),)
+
+
+class Archive:
+    """
+    Recorded responses indexed by request
+
+    Requests are matched on method, scheme, host, path and the sorted
+    query/form parameters, so parameter order and the URL fragment do not
+    matter.
+    """
+
+    def __init__(self, recordings=()):
+        self.exact = {}
+        self.endpoints = {}
+        for recording in recordings:
+            self.add(recording)
+
+    def add(self, recording):
+        self.exact[_key(recording.method, recording.url, recording.data)] = recording
+        self.endpoints.setdefault(_endpoint(recording.method, recording.url), []).append(recording)
+
+    def __len__(self):
+        return len(self.exact)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Load a .har, .warc or .warc.gz file
+
+        Args:
+            path (str): Archive path
+
+        Returns:
+            Archive: Indexed archive
+        """
+        if path.lower().endswith(".har"):
+            return cls(load_har(path))
+        return cls(load_warc(path))
+
+    def lookup(self, method, url, body):
+        """
+        Find the recorded response to a request
+
+        Returns:
+            Recording: Exact match, or None
+        """
+        return self.exact.get(_key(method, url, body))
+
+    def synthesize(self, method, url, body, max_reflections=3):
+        """
+        Model the response to a request that was never recorded
+
+        Args:
+            method (str): Request method
+            url (str): Request URL
+            body: Request body
+            max_reflections (int): Skip values reflected more often than
+                this; short values like "1" match unrelated text
+
+        Returns:
+            tuple: (Recording used as template, synthesized body), or None
+        """
+        candidates = self.endpoints.get(_endpoint(method, url))
+        if not candidates:
+            return None
+
+        params = dict(parse_qsl(urlsplit(url).query, keep_blank_values=True) + _form_params(body))
+        # Prefer a recording with the same parameter names
+        template = max(candidates, key=lambda r: len(set(dict(r.params)) & set(params)))
+
+        content = template.body
+        for name, old in template.params:
+            new = params.get(name)
+            if new is None or not old or new == old:
+                continue
+            old_bytes = old.encode()
+            if 0 < content.count(old_bytes) <= max_reflections:
+                content = content.replace(old_bytes, new.encode())
+        return template, content
+
+
+def load_har(path):
+    """
+    Read recordings from a HAR file
+
+    Args:
+        path (str): HAR path
+
+    Returns:
+        list: Recording objects
+    """
+    with open(path, encoding="utf-8") as f:
+        har = json.load(f)
+
+    recordings = []
+    for entry in har.get("log", {}).get("entries", []):
+        request = entry.get("request", {})
+        response = entry.get("response", {})
+
+        post = request.get("postData") or {}
+        body = post.get("text")
+        if body is None and post.get("params"):
+            body = urlencode([(p["name"], p.get("value", "")) for p in post["params"]])
+
+        content = response.get("content") or {}
+        text = content.get("text") or ""
+        if content.get("encoding") == "base64":
+            data = base64.b64decode(text)
+        else:
+            data = text.encode("utf-8")
+
+        headers = [(h["name"], h["value"]) for h in response.get("headers", [])]
+        recordings.append(Recording(request.get("method", "GET"), request["url"], body,
+                                    response.get("status", 200), response.get("statusText", ""),
+                                    headers, data))
+    return recordings
+
+
+def _warc_records(path):
+    opener = gzip.open if path.lower().endswith(".gz") else open
+    with opener(path, "rb") as f:
+        while True:
+            line = f.readline()
+            if not line:
+                return
+            if not line.startswith(b"WARC/"):
+                continue
+
+            headers = {}
+            while True:
+                line = f.readline()
+                if not line or not line.strip():
+                    break
+                name, _, value = line.decode("utf-8", "replace").partition(":")
+                headers[name.strip().lower()] = value.strip()
+
+            yield headers, f.read(int(headers.get("content-length", 0)))
+
+
+def _split_http(block):
+    """Split a raw HTTP message into (start line, header pairs, body)"""
+    head, separator, body = block.partition(b"\r\n\r\n")
+    if not separator:
+        head, _, body = block.partition(b"\n\n")
+    lines = head.decode("iso-8859-1").splitlines()
+    headers = []
+    for line in lines[1:]:
+        name, _, value = line.partition(":")
+        headers.append((name.strip(), value.strip()))
+    return (lines[0] if lines else ""), headers, body
+
+
+def _decode_body(headers, body):
+    values = {name.lower(): value.lower() for name, value in headers}
+
+    if "chunked" in values.get("transfer-encoding", ""):
+        decoded = b""
+        while body:
+            size_line, _, rest = body.partition(b"\r\n")
+            size = int(size_line.split(b";")[0].strip() or b"0", 16)
+            if size == 0:
+                break
+            decoded += rest[:size]
+            body = rest[size + 2:]
+        body = decoded
+
+    encoding = values.get("content-encoding", "")
+    try:
+        if encoding in ("gzip", "x-gzip"):
+            body = gzip.decompress(body)
+        elif encoding == "deflate":
+            body = zlib.decompress(body)
+    except (OSError, zlib.error):
+        pass
+    return body
+
+
+def load_warc(path):
+    """
+    Read recordings from a WARC file (optionally gzipped)
+
+    Response records are paired with their request records through
+    WARC-Concurrent-To to recover the method and form body; responses
+    without a request record are taken as GET.
+
+    Args:
+        path (str): WARC path
+
+    Returns:
+        list: Recording objects
+    """
+    responses = []
+    requests_by_id = {}
+
+    for headers, block in _warc_records(path):
+        kind = headers.get("warc-type")
+        if kind == "request":
+            start, _, body = _split_http(block)
+            request = (start.split(" ")[0] or "GET", body)
+            requests_by_id[headers.get("warc-record-id")] = request
+            if headers.get("warc-concurrent-to"):
+                requests_by_id[headers["warc-concurrent-to"]] = request
+        elif kind == "response":
+            responses.append((headers, block))
+
+    recordings = []
+    for headers, block in responses:
+        start, http_headers, body = _split_http(block)
+        parts = start.split(" ", 2)
+        if len(parts) < 2 or not parts[1].isdigit():
+            continue
+
+        method, request_body = requests_by_id.get(headers.get("warc-record-id")) or \
+            requests_by_id.get(headers.get("warc-concurrent-to")) or ("GET", None)
+        recordings.append(Recording(method, headers.get("warc-target-uri", ""), request_body,
+                                    int(parts[1]), parts[2] if len(parts) > 2 else "",
+                                    http_headers, _decode_body(http_headers, body)))
+    return recordings
+
+
+class ReplayAdapter(BaseAdapter):
+    """
+    requests transport adapter answering from an Archive
+
+    Args:
+        archive (Archive): Indexed recordings
+        synthesize (bool): Model responses for requests that were not recorded
+
+    Attributes:
+        stats (dict): Count of 'hit', 'synthesized' and 'miss' responses
+    """
+
+    def __init__(self, archive, synthesize=False):
+        super().__init__()
+        self.archive = archive
+        self.synthesize = synthesize
+        self.stats = {'hit': 0, 'synthesized': 0, 'miss': 0}
+        self._lock = threading.Lock()
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        recording = self.archive.lookup(request.method, request.url, request.body)
+        if recording is not None:
+            return self._build(request, recording, recording.body, "hit")
+
+        if self.synthesize:
+            modelled = self.archive.synthesize(request.method, request.url, request.body)
+            if modelled is not None:
+                return self._build(request, modelled[0], modelled[1], "synthesized")
+
+        miss = Recording(request.method, request.url, None, 404, "Not In Archive",
+                         [("Content-Type", "text/plain")], b"")
+        return self._build(request, miss, b"", "miss")
+
+    def _build(self, request, recording, content, source):
+        with self._lock:
+            self.stats[source] += 1
+
+        response = Response()
+        response.status_code = recording.status
+        response.reason = recording.reason
+        response.headers = CaseInsensitiveDict(recording.headers)
+        response.headers["X-XSSProbe-Replay"] = source
+        response._content = content
+        response.encoding = get_encoding_from_headers(response.headers)
+        response.url = request.url
+        response.request = request
+        response.connection = self
+        return response
+
+    def close(self):
+        pass
@@ -0,0 +1,356 @@
+"""
+Programmatic Scan API for XSSProbe
+Runs a complete scan (crawl, reflected XSS, DOM XSS) without global state
+
+A Scanner owns everything a scan needs: its configuration, HTTP session,
+filter probe cache and crawl frontier. Several scanners can run at the
+same time in one process. Results are streamed as ScanEvent objects
+through a plain generator or an async iterator, and a scan can be
+cancelled from any thread.
+
+Example:
+    >>> scanner = Scanner(ScanConfig("http://testphp.vulnweb.com", depth=1))
+    >>> for event in scanner.events():
+    ...     if event.kind == ScanEvent.FINDING:
+    ...         print(event.data["url"])
+"""
+
+import ast
+import asyncio
+import json
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from lib.analysis import AnalysisPool
+from lib.budget import BudgetAdapter, BudgetExhausted, ScanBudget, endpoint_cluster, host_of
+from lib.core import core
+from lib.crawler.crawler import crawler
+from lib.dom_xss import DOMXSSDetector
+from lib.event import ScanEvent
+from lib.helper.helper import agent, parse_cookie, session
+from lib.helper.Log import Log
+from lib.probe import FilterProbe
+from lib.payloads import PayloadLibrary
+
+
+class ScanConfig:
+    """
+    Per-scan settings
+
+    Attributes:
+        url (str): Start URL
+        depth (int): Link hops to crawl beyond the start page, None for a single page
+        method (int): 0 GET, 1 POST, 2 GET and POST
+        payload (str): Force a single payload, None for ranked corpus payloads
+        proxy (dict): Requests proxies mapping (a dict literal string is accepted)
+        headers (dict): Request headers (a plain string is used as User-Agent)
+        cookie (dict): Cookies (a JSON string is accepted)
+        dom_xss (bool): Run DOM XSS detection on the start page
+        max_payloads (int): Payloads tried per injection point
+        threads (int): Pages fetched concurrently
+        workers (int): Processes for page analysis, 0 parses in-process
+        max_requests, max_bytes, max_seconds (int): Scan-wide budget, None for no limit
+        host_requests, host_bytes, host_seconds (int): Per-host budget, None for no limit
+        quiet (bool): Do not print log lines, only yield events
+    """
+
+    def __init__(self, url, depth=None, method=2, payload=None, proxy=None, headers=None,
+                 cookie=None, dom_xss=False, max_payloads=core.max_payloads, threads=4, workers=0,
+                 max_requests=None, max_bytes=None, max_seconds=None,
+                 host_requests=None, host_bytes=None, host_seconds=None, quiet=False):
+        self.url = url
+        self.depth = depth
+        self.method = method
+        self.payload = payload
+        self.proxy = ast.literal_eval(proxy) if isinstance(proxy, str) else proxy
+        if headers is None:
+            headers = dict(agent)
+        self.headers = headers if isinstance(headers, dict) else {'User-Agent': headers}
+        if cookie is None:
+            cookie = {}
+        self.cookie = json.dumps(parse_cookie(cookie) if isinstance(cookie, str) else cookie)
+        self.dom_xss = dom_xss
+        self.max_payloads = max_payloads
+        self.threads = max(1, int(threads))
+        self.workers = int(workers)
+        self.max_requests = max_requests
+        self.max_bytes = max_bytes
+        self.max_seconds = max_seconds
+        self.host_requests = host_requests
+        self.host_bytes = host_bytes
+        self.host_seconds = host_seconds
+        self.quiet = bool(quiet)
+
+    def to_dict(self):
+        return {
+            'url': self.url,
+            'depth': self.depth,
+            'method': self.method,
+            'payload': self.payload,
+            'proxy': self.proxy,
+            'headers': self.headers,
+            'cookie': json.loads(self.cookie),
+            'dom_xss': self.dom_xss,
+            'max_payloads': self.max_payloads,
+            'threads': self.threads,
+            'workers': self.workers,
+            'max_requests': self.max_requests,
+            'max_bytes': self.max_bytes,
+            'max_seconds': self.max_seconds,
+            'host_requests': self.host_requests,
+            'host_bytes': self.host_bytes,
+            'host_seconds': self.host_seconds,
+            'quiet': self.quiet
+        }
+
+
+class Scanner:
+    """
+    One scan, streamed as events
+
+    A Scanner is single-use per events() call but keeps no state outside
+    the instance, so independent scanners are safe to run concurrently.
+
+    Pages of a crawl level are fetched by `config.threads` I/O threads, at
+    most twice that many ahead of the consumer, and parsed by an
+    AnalysisPool; the attack requests of a page then run in the consuming
+    thread, page by page.
+
+    With a budget (see ScanBudget) every request is charged to it. As the
+    budget runs low, pages get fewer payloads, DOM findings go unconfirmed
+    and only one page per endpoint cluster is crawled; the final 'done'
+    event reports what was given up.
+    """
+
+    def __init__(self, config, library=None, adapter=None, pool=None):
+        self.config = config
+        self.library = library if library is not None else PayloadLibrary.default()
+        self.adapter = adapter
+        self.pool = pool
+        self.findings = []
+        self.budget = ScanBudget.from_config(config)
+        self._cancelled = threading.Event()
+
+    def cancel(self):
+        """Stop the scan at the next request boundary (thread-safe)"""
+        self._cancelled.set()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def make_session(self):
+        """
+        Build the HTTP session used by every request of this scan
+
+        Returns:
+            requests.Session: Configured session
+        """
+        adapter = self.adapter
+        if self.budget.limited:
+            adapter = BudgetAdapter(self.budget, adapter)
+        return session(self.config.proxy, dict(self.config.headers), self.config.cookie, adapter)
+
+    def events(self):
+        """
+        Run the scan
+
+        Yields:
+            ScanEvent: Progress, findings and errors as they happen, then a
+            final 'done' event with a summary. Closing the generator early
+            stops the scan as well.
+        """
+        # Log lines are silenced per thread, so only while the scan runs
+        scan = self._scan()
+        try:
+            while True:
+                with Log.silenced(self.config.quiet):
+                    try:
+                        event = next(scan)
+                    except StopIteration:
+                        return
+                yield event
+        finally:
+            with Log.silenced(self.config.quiet):
+                scan.close()
+
+    def _scan(self):
+        config = self.config
+        budget = self.budget = ScanBudget.from_config(config)
+        budget.start()
+        sess = self.make_session()
+        engine = core(probe=FilterProbe(), library=self.library)
+        engine.max_payloads = config.max_payloads
+
+        pool = self.pool if self.pool is not None else AnalysisPool(config.workers)
+        fetcher = ThreadPoolExecutor(max_workers=config.threads, thread_name_prefix="xssprobe-fetch")
+
+        visited = {config.url}
+        clusters = set()
+        frontier = [config.url]
+        max_hops = None if config.depth is None else int(config.depth) + 1
+        pages = 0
+        hop = 0
+
+        # Fetches run at most `window` pages ahead of the page being attacked,
+        # so budget pressure and sampling apply to the rest of the level
+        window = config.threads * 2
+        pending = deque()
+        fetches = deque()
+
+        def fill():
+            while pending and len(fetches) < window:
+                url = pending.popleft()
+                if budget.exhausted(host_of(url)):
+                    budget.sacrifice('unscanned_pages')
+                elif not self._sampled(url, budget, clusters):
+                    # The start page is parsed once for both the attack and the DOM scan
+                    dom = hop == 0 and config.dom_xss and pool.workers > 0
+                    fetches.append((url, fetcher.submit(self._fetch, sess, pool, url, dom)))
+
+        try:
+            while frontier and not self.cancelled:
+                if budget.exhausted():
+                    budget.sacrifice('unscanned_pages', len(frontier))
+                    break
+                next_frontier = []
+                pending.extend(frontier)
+                fill()
+                while fetches and not self.cancelled:
+                    url, fetch = fetches.popleft()
+                    fill()
+                    yield ScanEvent.progress("fetch", url=url, hop=hop)
+                    try:
+                        response, page = fetch.result()
+                    except BudgetExhausted:
+                        budget.sacrifice('unscanned_pages')
+                        continue
+                    except Exception as e:
+                        yield ScanEvent.error(str(e), url=url)
+                        continue
+                    pages += 1
+                    yield from self._degrade(engine, budget, url)
+
+                    page_events = engine.scan_page(url, response, sess, config.payload, config.method, page)
+                    try:
+                        for event in page_events:
+                            yield from self._emit(event)
+                            if self.cancelled:
+                                break
+                    except BudgetExhausted as e:
+                        budget.sacrifice('interrupted_pages')
+                        yield ScanEvent.error(str(e), url=url)
+                    finally:
+                        page_events.close()
+
+                    if hop == 0 and config.dom_xss and not self.cancelled:
+                        confirm = not budget.degraded('dom', host_of(url))
+                        if not confirm:
+                            budget.sacrifice('skipped_dom_confirmations')
+                        yield from self._dom_scan(url, sess, pool, confirm, response.text, page)
+
+                    if max_hops is not None and hop < max_hops:
+                        next_frontier.extend(crawler.filterLinks(url, page.links, visited))
+
+                frontier = [url for url in next_frontier if url.startswith(("http://", "https://"))]
+                hop += 1
+        finally:
+            # Closing the generator must not leave queued requests running
+            for url, fetch in fetches:
+                fetch.cancel()
+            fetcher.shutdown(wait=False, cancel_futures=True)
+            if pool is not self.pool:
+                pool.shutdown()
+
+        self.library.save()
+        yield ScanEvent(ScanEvent.DONE, pages=pages, findings=len(self.findings),
+                        cancelled=self.cancelled, budget=budget.report())
+
+    @staticmethod
+    def _fetch(sess, pool, url, dom=False):
+        response = sess.get(url, timeout=10, verify=False)
+        return response, pool.parse(url, response.text, dom)
+
+    def _degrade(self, engine, budget, url):
+        """Scale the payloads tried on a page down with the budget pressure"""
+        pressure = budget.pressure(host_of(url))
+        if pressure < budget.STEPS['payloads']:
+            engine.max_payloads = self.config.max_payloads
+            engine.variants = True
+            return
+
+        engine.max_payloads = max(1, int(self.config.max_payloads * (1 - pressure)))
+        engine.variants = False
+        budget.sacrifice('reduced_payload_pages')
+        yield ScanEvent.progress("budget", url=url, pressure=round(pressure, 2),
+                                 max_payloads=engine.max_payloads)
+
+    @staticmethod
+    def _sampled(url, budget, clusters):
+        """Under high pressure, skip a URL whose endpoint cluster was already crawled"""
+        cluster = endpoint_cluster(url)
+        if cluster in clusters and budget.degraded('sample', host_of(url)):
+            budget.sacrifice('sampled_pages')
+            return True
+        clusters.add(cluster)
+        return False
+
+    def _emit(self, event):
+        if event.kind == ScanEvent.FINDING:
+            self.findings.append(event)
+        yield event
+
+    def _dom_scan(self, url, sess, pool, confirm=True, html=None, page=None):
+        yield ScanEvent.progress("dom", url=url)
+        detector = DOMXSSDetector(library=self.library, pool=pool)
+        results = detector.scan_for_dom_xss(url, session_obj=sess, save=False, confirm=confirm,
+                                            html=html, page=page)
+
+        if results.get('error'):
+            yield ScanEvent.error(results['error'], url=url)
+            return
+        if results.get('incomplete_scripts'):
+            yield ScanEvent.error("JavaScript analysis incomplete, flows may be missing", url=url,
+                                  scripts=results['incomplete_scripts'])
+
+        for vuln in results.get('vulnerabilities', []):
+            yield from self._emit(ScanEvent.finding("DOM XSS", url, pattern=vuln['pattern'],
+                                                    severity=vuln['severity'],
+                                                    description=vuln['description'],
+                                                    path=vuln.get('path')))
+        for test in results.get('successful_tests', []):
+            yield from self._emit(ScanEvent.finding("DOM XSS", test['url'], method="DOM",
+                                                    payload=test['payload'], confirmed=True))
+
+    def __iter__(self):
+        return self.events()
+
+    async def __aiter__(self):
+        """
+        Async iterator over the scan's events
+
+        The blocking scan runs in the default executor; events are handed
+        over to the event loop as they are produced. Closing the iterator
+        (e.g. through contextlib.aclosing) cancels the scan; after a plain
+        break call cancel() to stop it right away.
+        """
+        loop = asyncio.get_event_loop()
+        queue = asyncio.Queue()
+
+        def pump():
+            try:
+                for event in self.events():
+                    loop.call_soon_threadsafe(queue.put_nowait, event)
+            finally:
+                loop.call_soon_threadsafe(queue.put_nowait, None)
+
+        worker = loop.run_in_executor(None, pump)
+        try:
+            while True:
+                event = await queue.get()
+                if event is None:
+                    break
+                yield event
+        finally:
+            self.cancel()
+            await worker
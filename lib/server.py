@@ -0,0 +1,305 @@
+"""
+Daemon Mode for XSSProbe
+Long-running scan service with a local HTTP/JSON job API
+
+The daemon imports the scanning stack and loads the payload corpus once,
+keeps a pool of warm worker threads and shares one HTTP connection pool
+between all scans. Jobs are submitted and followed over plain HTTP:
+
+    POST   /scans               submit a scan (JSON ScanConfig fields)
+    GET    /scans               list jobs
+    GET    /scans/<id>          job status and findings
+    GET    /scans/<id>/events   stream events as JSON lines (?since=N to resume)
+    DELETE /scans/<id>          cancel a job
+
+Only bind it to localhost (the default): the API has no authentication.
+"""
+
+import json
+import re
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+from requests.adapters import HTTPAdapter
+from lib.analysis import AnalysisPool
+from lib.event import ScanEvent
+from lib.helper.Log import Log
+from lib.payloads import PayloadLibrary
+from lib.scanner import Scanner, ScanConfig
+
+DEFAULT_ADDRESS = "127.0.0.1:8777"
+
+
+class Job:
+    """
+    A submitted scan and the events it has produced so far
+
+    Attributes:
+        id (str): Job identifier
+        status (str): queued, running, done, cancelled or failed
+        events (list): Every ScanEvent emitted, in order
+    """
+
+    FINISHED = ("done", "cancelled", "failed")
+
+    def __init__(self, config, scanner):
+        self.id = uuid.uuid4().hex[:12]
+        self.config = config
+        self.scanner = scanner
+        self.status = "queued"
+        self.events = []
+        self._changed = threading.Condition()
+
+    @property
+    def finished(self):
+        return self.status in self.FINISHED
+
+    def run(self):
+        """Worker entry point: run the scan and record its events"""
+        if self.scanner.cancelled:
+            self._set_status("cancelled")
+            return
+
+        self._set_status("running")
+        try:
+            for event in self.scanner.events():
+                self._append(event)
+        except Exception as e:
+            Log.high("Job " + self.id + " failed: " + str(e))
+            self._append(ScanEvent.error(str(e)))
+            self._set_status("failed")
+            return
+
+        self._set_status("cancelled" if self.scanner.cancelled else "done")
+
+    def cancel(self):
+        self.scanner.cancel()
+        if self.status == "queued":
+            self._set_status("cancelled")
+
+    def wait_events(self, since, timeout=15):
+        """
+        Block until there are events after `since` or the job finished
+
+        Args:
+            since (int): Number of events the caller has already seen
+            timeout (float): Maximum seconds to wait
+
+        Returns:
+            list: New events (possibly empty on timeout)
+        """
+        with self._changed:
+            self._changed.wait_for(lambda: len(self.events) > since or self.finished, timeout)
+            return self.events[since:]
+
+    def summary(self):
+        with self._changed:
+            findings = [event.to_dict() for event in self.events if event.kind == ScanEvent.FINDING]
+            return {
+                'id': self.id,
+                'status': self.status,
+                'config': self.config.to_dict(),
+                'events': len(self.events),
+                'findings': findings
+            }
+
+    def _append(self, event):
+        with self._changed:
+            self.events.append(event)
+            self._changed.notify_all()
+
+    def _set_status(self, status):
+        with self._changed:
+            self.status = status
+            self._changed.notify_all()
+
+
+class JobManager:
+    """
+    Runs jobs on a fixed pool of warm worker threads
+
+    Every scan mounts the same HTTPAdapter, so keep-alive connections to
+    a target are reused across jobs instead of being reopened per scan,
+    and hands its pages to the same AnalysisPool of parser processes.
+    """
+
+    def __init__(self, jobs=4, workers=None, keep_finished=100):
+        self.keep_finished = keep_finished
+        self.adapter = HTTPAdapter(pool_connections=jobs * 4, pool_maxsize=jobs * 4)
+        self.pool = AnalysisPool(AnalysisPool.default_workers() if workers is None else workers)
+        self.library = PayloadLibrary.default()
+        self.executor = ThreadPoolExecutor(max_workers=jobs, thread_name_prefix="xssprobe-job")
+        self.jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, config):
+        """
+        Queue a scan
+
+        Args:
+            config (ScanConfig): Scan settings
+
+        Returns:
+            Job: The queued job
+        """
+        scanner = Scanner(config, library=self.library, adapter=self.adapter, pool=self.pool)
+        job = Job(config, scanner)
+        with self._lock:
+            self.jobs[job.id] = job
+            self._prune()
+        self.executor.submit(job.run)
+        Log.info("Job " + job.id + " queued: " + config.url)
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self.jobs.get(job_id)
+
+    def list(self):
+        with self._lock:
+            return [{'id': job.id, 'status': job.status, 'url': job.config.url}
+                    for job in self.jobs.values()]
+
+    def shutdown(self):
+        with self._lock:
+            jobs = list(self.jobs.values())
+        for job in jobs:
+            job.cancel()
+        self.executor.shutdown(wait=True)
+        self.pool.shutdown()
+        self.library.save()
+
+    def _prune(self):
+        finished = [job_id for job_id, job in self.jobs.items() if job.finished]
+        for job_id in finished[:max(0, len(finished) - self.keep_finished)]:
+            del self.jobs[job_id]
+
+
+class JobAPIHandler(BaseHTTPRequestHandler):
+    """HTTP front-end for a JobManager (set as the server's `manager`)"""
+
+    server_version = "XSSProbe"
+
+    def log_message(self, format, *args):
+        pass
+
+    @property
+    def manager(self):
+        return self.server.manager
+
+    def send_json(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def route(self):
+        """
+        Match /scans[/<id>[/events]]
+
+        Returns:
+            tuple: (matched, job id or None, events endpoint)
+        """
+        match = re.match(r'^/scans(?:/(\w+)(/events)?)?$', urlparse(self.path).path.rstrip("/"))
+        if not match:
+            return False, None, False
+        return True, match.group(1), bool(match.group(2))
+
+    def do_POST(self):
+        matched, job_id, events = self.route()
+        if not matched or job_id is not None:
+            return self.send_json(404, {'error': 'not found'})
+
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            body = json.loads(self.rfile.read(length) or b"{}")
+            config = ScanConfig(**body)
+        except (ValueError, TypeError, SyntaxError) as e:
+            return self.send_json(400, {'error': 'invalid scan config: ' + str(e)})
+
+        job = self.manager.submit(config)
+        self.send_json(201, {'id': job.id, 'status': job.status})
+
+    def do_GET(self):
+        matched, job_id, events = self.route()
+        if not matched:
+            return self.send_json(404, {'error': 'not found'})
+        if job_id is None:
+            return self.send_json(200, {'jobs': self.manager.list()})
+
+        job = self.manager.get(job_id)
+        if job is None:
+            return self.send_json(404, {'error': 'unknown job'})
+        if not events:
+            return self.send_json(200, job.summary())
+
+        query = parse_qs(urlparse(self.path).query)
+        self.stream_events(job, int(query.get("since", ["0"])[0]))
+
+    def do_DELETE(self):
+        matched, job_id, events = self.route()
+        job = self.manager.get(job_id) if job_id and not events else None
+        if job is None:
+            return self.send_json(404, {'error': 'unknown job'})
+        job.cancel()
+        self.send_json(200, {'id': job.id, 'status': job.status})
+
+    def stream_events(self, job, since):
+        """Write events as JSON lines until the job finishes"""
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        try:
+            while True:
+                new_events = job.wait_events(since)
+                for event in new_events:
+                    self.wfile.write((json.dumps(event.to_dict()) + "\n").encode())
+                since += len(new_events)
+                self.wfile.flush()
+                if job.finished and since >= len(job.events):
+                    return
+        except (BrokenPipeError, ConnectionResetError):
+            return
+
+
+def parse_address(address):
+    """
+    Split HOST:PORT (or just PORT)
+
+    Returns:
+        tuple: (host, port)
+    """
+    host, _, port = str(address).rpartition(":")
+    return host or "127.0.0.1", int(port)
+
+
+def serve(address=DEFAULT_ADDRESS, jobs=4, workers=None):
+    """
+    Run the daemon until interrupted
+
+    Args:
+        address (str): HOST:PORT to listen on
+        jobs (int): Number of scans run concurrently
+        workers (int): Page analysis processes, None for one per CPU
+    """
+    host, port = parse_address(address)
+    httpd = ThreadingHTTPServer((host, port), JobAPIHandler)
+    httpd.daemon_threads = True
+    httpd.manager = JobManager(jobs=jobs, workers=workers)
+
+    Log.info("XSSProbe daemon listening on http://%s:%d (%d jobs, %d analysis workers)"
+             % (host, port, jobs, httpd.manager.pool.workers))
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        Log.info("Shutting down...")
+    finally:
+        httpd.server_close()
+        httpd.manager.shutdown()
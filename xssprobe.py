@@ -1,15 +1,24 @@
 
 import argparse
+import json
 from lib.helper.helper import *
 from lib.helper.Log import *
-from lib.core import *
-from lib.dom_xss import DOMXSSDetector
 from random import randint
-from lib.crawler.crawler import *
+from lib.event import ScanEvent
+# The scanning stack (lib.core, lib.scanner, bs4, requests) is imported
+# lazily below so --help, --about and daemon clients start instantly
 epilog="""
 Github: https://www.github.com/hackelite01/XSSProbe
 """
 def check(getopt):
+	if getopt.payload is not None:
+		return getopt.payload
+	if getopt.payload_level is None:
+		# Ranked payloads from the corpus are picked per injection point
+		return None
+	
+	from lib.core import core
+	
 	payload=int(getopt.payload_level)
 	if payload > 6 and getopt.payload is None:
 		Log.info("Do you want use custom payload (Y/n)?")
@@ -25,6 +34,35 @@ def check(getopt):
 			
 	return payload if getopt.payload is None else getopt.payload
 	
+def run(events,remote=False):
+	for event in events:
+		if remote:
+			# The daemon logs to its own console, echo the essentials here
+			if event.kind == ScanEvent.PROGRESS and event.data["stage"] == "page":
+				Log.info("Testing target: "+event.data["url"])
+			elif event.kind == ScanEvent.FINDING and event.data["type"] != "DOM XSS":
+				Log.high("Detected XSS ("+event.data["method"]+") at "+event.data["url"])
+			elif event.kind == ScanEvent.ERROR:
+				Log.warning(event.data["message"])
+		
+		if event.kind == ScanEvent.FINDING:
+			if event.data["type"] == "DOM XSS":
+				flow=" -> ".join(event.data.get("path") or [])
+				Log.high("DOM XSS found: "+event.data["url"]+(" ("+flow+")" if flow else ""))
+				with open("dom_xss_results.txt","a") as file:
+					file.write(json.dumps(event.to_dict())+"\n")
+			else:
+				with open("xss.txt","a") as file:
+					file.write(str(event.data["url"])+"\n\n")
+				
+		elif event.kind == ScanEvent.DONE:
+			Log.info("Scan finished: "+G+str(event.data["pages"])+N+" page(s), "+G+str(event.data["findings"])+N+" finding(s)")
+			budget=event.data.get("budget") or {}
+			if budget.get("exhausted"):
+				Log.warning("Stopped early: "+budget["exhausted"])
+			if budget.get("sacrificed"):
+				Log.warning("Coverage sacrificed to the budget: "+", ".join(kind.replace("_"," ")+" "+G+str(count)+N for kind,count in budget["sacrificed"].items()))
+	
 def start():
 	parse=argparse.ArgumentParser(formatter_class=argparse.RawTextHelpFormatter,usage="XSSProbe -u <target> [options]",epilog=epilog,add_help=False)
 	
@@ -32,48 +70,93 @@ def start():
 	pos_opt.add_argument("--help",action="store_true",default=False,help="Show usage and help parameters")
 	pos_opt.add_argument("-u",metavar="",help="Target url (e.g. http://testphp.vulnweb.com)")
 	pos_opt.add_argument("--depth",metavar="",help="Depth web page to crawl. Default: 2",default=2)
-	pos_opt.add_argument("--payload-level",metavar="",help="Level for payload Generator, 7 for custom payload. {1...6}. Default: 6",default=6)
+	pos_opt.add_argument("--payload-level",metavar="",help="Level for payload Generator, 7 for custom payload. {1...6}.\nDefault: ranked payloads from lib/data/payloads.txt",default=None)
 	pos_opt.add_argument("--payload",metavar="",help="Load custom payload directly (e.g. <script>alert(2005)</script>)",default=None)
 	pos_opt.add_argument("--method",metavar="",help="Method setting(s): \n\t0: GET\n\t1: POST\n\t2: GET and POST (default)",default=2,type=int)
 	pos_opt.add_argument("--user-agent",metavar="",help="Request user agent (e.g. Chrome/2.1.1/...)",default=agent)
 	pos_opt.add_argument("--single",metavar="",help="Single scan. No crawling just one address")
 	pos_opt.add_argument("--proxy",default=None,metavar="",help="Set proxy (e.g. {'https':'https://10.10.1.10:1080'})")
 	pos_opt.add_argument("--dom-xss",action="store_true",help="Enable DOM XSS detection (JavaScript analysis)")
+	pos_opt.add_argument("--threads",metavar="",help="Pages fetched concurrently. Default: 4",default=4,type=int)
+	pos_opt.add_argument("--workers",metavar="",help="Processes for HTML/JS analysis, 0 parses in-process.\nDefault: 0, one per CPU with --serve",default=None,type=int)
 	pos_opt.add_argument("--about",action="store_true",help="Print information about XSSProbe tool")
 	pos_opt.add_argument("--cookie",help="Set cookie (e.g {'ID':'1094200543'})",default='''{"ID":"1094200543"}''',metavar="")
 	
+	daemon_opt=parse.add_argument_group("Daemon")
+	daemon_opt.add_argument("--serve",action="store_true",help="Run as a daemon serving the local HTTP/JSON job API")
+	daemon_opt.add_argument("--listen",metavar="",help="Daemon address (HOST:PORT). Default: 127.0.0.1:8777",default="127.0.0.1:8777")
+	daemon_opt.add_argument("--jobs",metavar="",help="Scans the daemon runs concurrently. Default: 4",default=4,type=int)
+	daemon_opt.add_argument("--server",metavar="",help="Submit -u/--single scans to a running daemon (e.g. 127.0.0.1:8777)",default=None)
+	
+	budget_opt=parse.add_argument_group("Budget")
+	budget_opt.add_argument("--max-requests",metavar="",help="Requests the whole scan may send",default=None,type=int)
+	budget_opt.add_argument("--max-bytes",metavar="",help="Response bytes the whole scan may download",default=None,type=int)
+	budget_opt.add_argument("--max-time",metavar="",help="Wall-clock seconds for the whole scan",default=None,type=float)
+	budget_opt.add_argument("--host-max-requests",metavar="",help="Requests per host",default=None,type=int)
+	budget_opt.add_argument("--host-max-bytes",metavar="",help="Response bytes per host",default=None,type=int)
+	budget_opt.add_argument("--host-max-time",metavar="",help="Seconds spent waiting on each host",default=None,type=float)
+	
+	replay_opt=parse.add_argument_group("Replay")
+	replay_opt.add_argument("--replay",metavar="",help="Answer every request from a recorded archive (.har, .warc, .warc.gz)\ninstead of the network",default=None)
+	replay_opt.add_argument("--synthesize",action="store_true",help="With --replay, model responses missing from the archive\nby reflecting the new parameter values into a recorded response")
+	
 	getopt=parse.parse_args()
 	print(logo)
 	Log.info("Starting XSSProbe...")
-	if getopt.u:
-		core.main(getopt.u,getopt.proxy,getopt.user_agent,check(getopt),getopt.cookie,getopt.method)
-		
-		if getopt.dom_xss:
-			Log.info("Starting DOM XSS detection...")
-			dom_detector = DOMXSSDetector()
-			dom_vulnerabilities = dom_detector.scan_for_dom_xss(getopt.u)
-			if dom_vulnerabilities:
-				Log.info(f"Found {len(dom_vulnerabilities)} potential DOM XSS vulnerabilities!")
-				for vuln in dom_vulnerabilities:
-					Log.high(f"DOM XSS found: {vuln}")
-			else:
-				Log.info("No DOM XSS vulnerabilities detected.")
+	if getopt.serve:
+		from lib.server import serve
+		serve(getopt.listen,getopt.jobs,getopt.workers)
 		
-		crawler.crawl(getopt.u,int(getopt.depth),getopt.proxy,getopt.user_agent,check(getopt),getopt.method,getopt.cookie)
+	elif getopt.u or getopt.single:
+		try:
+			cookie=parse_cookie(getopt.cookie)
+		except ValueError as e:
+			Log.warning("Invalid --cookie: "+str(e))
+			return
 		
-	elif getopt.single:
-		core.main(getopt.single,getopt.proxy,getopt.user_agent,check(getopt),getopt.cookie,getopt.method)
-		
-		if getopt.dom_xss:
-			Log.info("Starting DOM XSS detection...")
-			dom_detector = DOMXSSDetector()
-			dom_vulnerabilities = dom_detector.scan_for_dom_xss(getopt.single)
-			if dom_vulnerabilities:
-				Log.info(f"Found {len(dom_vulnerabilities)} potential DOM XSS vulnerabilities!")
-				for vuln in dom_vulnerabilities:
-					Log.high(f"DOM XSS found: {vuln}")
-			else:
-				Log.info("No DOM XSS vulnerabilities detected.")
+		config={
+			"url":getopt.u or getopt.single,
+			"depth":int(getopt.depth) if getopt.u else None,
+			"method":getopt.method,
+			"payload":check(getopt),
+			"proxy":getopt.proxy,
+			"headers":getopt.user_agent,
+			"cookie":cookie,
+			"dom_xss":getopt.dom_xss,
+			"threads":getopt.threads,
+			"workers":getopt.workers or 0,
+			"max_requests":getopt.max_requests,
+			"max_bytes":getopt.max_bytes,
+			"max_seconds":getopt.max_time,
+			"host_requests":getopt.host_max_requests,
+			"host_bytes":getopt.host_max_bytes,
+			"host_seconds":getopt.host_max_time
+		}
+		if getopt.replay:
+			from lib.replay import Archive, ReplayAdapter
+			from lib.scanner import Scanner, ScanConfig
+			archive=Archive.load(getopt.replay)
+			Log.info("Replaying "+G+str(len(archive))+N+" recorded response(s) from "+getopt.replay)
+			from lib.payloads import PayloadLibrary
+			adapter=ReplayAdapter(archive,synthesize=getopt.synthesize)
+			# Fresh, unsaved stats: replayed outcomes must not rank live scans,
+			# and every replay of an archive must send the same payloads
+			library=PayloadLibrary(stats_path=None)
+			run(Scanner(ScanConfig(**config),library=library,adapter=adapter).events())
+			Log.info("Replay: "+", ".join(G+str(count)+N+" "+source for source,count in adapter.stats.items()))
+		elif getopt.server:
+			from lib.client import XSSProbeClient
+			client=XSSProbeClient(getopt.server)
+			job_id=client.submit(config)
+			Log.info("Submitted job "+G+job_id+N+" to "+getopt.server)
+			try:
+				run(client.events(job_id),remote=True)
+			except KeyboardInterrupt:
+				client.cancel(job_id)
+				Log.warning("Job "+job_id+" cancelled")
+		else:
+			from lib.scanner import Scanner, ScanConfig
+			run(Scanner(ScanConfig(**config)).events())
 		
 	elif getopt.about:
 		print("""